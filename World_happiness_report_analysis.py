@@ -17,8 +17,6 @@
 # 
 # > The library used in the implementation of this work is the pandas library. Standard operations performed with it were reading data, reviewing data structure, creating data frames, as well as cleaning and modifying data.
 # 
-# > GeoPandas is a geospatial data library. Thanks to this library, it is possible to reference information spatially without the need to connect additional databases such as PostGIS. In this project, the library was used to prepare interactive maps.
-# 
 # > Another library used in the project is Matplotlib. It is used to create various types of charts. This library can be imported in several ways. The official documentation suggests, however, to use explicit imports in more complex projects, i.e. use
 # > - import numpy as e.g.
 # > - import matplotlib.pyplot as plt
@@ -33,21 +31,11 @@
 
 
 import pandas as pd
-import geopandas
 import numpy as np
-import matplotlib.pyplot as plt
-import plotly
-import plotly.graph_objs as go
-import plotly.express as px
-import chart_studio.plotly as py
-from plotly.offline import init_notebook_mode, iplot
-
-import seaborn as sns
 
-from itables import init_notebook_mode
-init_notebook_mode(all_interactive=True)
-import itables.options as opt
-from itables import show
+#the visualization libraries (plotly, matplotlib, seaborn, itables) are imported lazily,
+#in the cells that need them, so the data preparation alone starts quickly
+from happiness import backends
 
 
 pd.options.mode.chained_assignment = None
@@ -99,20 +87,17 @@ pd.options.mode.chained_assignment = None
 # In[2]:
 
 
-#data loading
-data2015=pd.read_csv('./2015.csv')
+#data loading - every year is described in the schema registry (happiness/schema.py),
+#the loader reads only the needed columns, renames them, attaches the region and normalizes the data,
+#the prepared data is cached in the .cache folder and reused as long as the csv files do not change
+from happiness import load_panel
 
-#displaying data information
-data2015.info()
+frames, ranking = load_panel()
 
-#adding a column with the year to which the data relate
-data2015['Year'] = 2015 
+data2015 = frames[2015]
 
-#data normalization
-column = ['Happiness Score','Economy (GDP per Capita)', 'Family', 'Health (Life Expectancy)',
-         'Freedom','Trust (Government Corruption)','Generosity']
-    
-data2015[column] = (data2015[column] - data2015[column].min()) / (data2015[column].max() - data2015[column].min())    
+#displaying data information
+data2015.info()
 
 #showing the data
 data2015.sort_values(by=['Happiness Rank']).head(5)
@@ -121,21 +106,11 @@ data2015.sort_values(by=['Happiness Rank']).head(5)
 # In[3]:
 
 
-#data loading
-data2016=pd.read_csv('./2016.csv')
+data2016 = frames[2016]
 
 #displaying data information
 data2016.info()
 
-#adding a column with the year to which the data relate
-data2016['Year'] = 2016
-
-#data normalization
-column = ['Happiness Score','Economy (GDP per Capita)', 'Family', 'Health (Life Expectancy)',
-         'Freedom','Trust (Government Corruption)','Generosity']
-    
-data2016[column] = (data2016[column] - data2016[column].min()) / (data2016[column].max() - data2016[column].min())    
-
 #showing the data
 data2016.sort_values(by=['Happiness Rank']).head(5)
 
@@ -143,100 +118,35 @@ data2016.sort_values(by=['Happiness Rank']).head(5)
 # In[4]:
 
 
-#data loading
-data2017=pd.read_csv('./2017.csv')
+data2017 = frames[2017]
 
 #displaying data information
 data2017.info()
 
-#inclusion of information about the region based on previously implemented data
-data2017 = pd.merge(data2016, data2017, how="inner", on="Country")
-
-
-data2017=data2017[['Country','Region', 'Happiness.Rank','Happiness.Score',
-                  'Economy..GDP.per.Capita.','Family_y','Health..Life.Expectancy.', 'Freedom_y',
-                   'Generosity_y','Trust..Government.Corruption.','Dystopia.Residual']]  
-
-#renaming columns
-data2017 = data2017.rename(columns = {'Country' : 'Country','Happiness.Rank':'Happiness Rank', 'Happiness.Score' : 'Happiness Score', 
-                                      'Economy..GDP.per.Capita.' : 'Economy (GDP per Capita)', 'Family_y': 'Family', 'Health..Life.Expectancy.' : 'Health (Life Expectancy)',
-                                      'Freedom_y':'Freedom','Generosity_y':'Generosity', 'Trust..Government.Corruption.' : 'Trust (Government Corruption)', 'Dystopia.Residual' : 'Dystopia Residual'})          
-
-#adding a column with the year to which the data relate
-data2017['Year'] = 2017 
-
-#data normalization
-column = ['Happiness Score','Economy (GDP per Capita)', 'Family', 'Health (Life Expectancy)',
-         'Freedom','Trust (Government Corruption)','Generosity']
-    
-data2017[column] = (data2017[column] - data2017[column].min()) / (data2017[column].max() - data2017[column].min())    
-
-#showing the data 
+#showing the data
 data2017.sort_values(by=['Happiness Rank']).head(5)
 
 
 # In[5]:
 
 
-#data loading
-data2018=pd.read_csv('./2018.csv')
+data2018 = frames[2018]
 
 #displaying data information
 data2018.info()
 
-#inclusion of information about the region based on previously implemented data
-data2018 = pd.merge(data2016, data2018, how="inner", left_on='Country', right_on='Country or region')
-                    
-data2018=data2018[['Country or region','Region','Overall rank', 'Score','GDP per capita','Social support', 'Healthy life expectancy',
-                  'Freedom to make life choices','Generosity_y','Perceptions of corruption']]  
-
-#renaming columns
-data2018 = data2018.rename(columns = {'Overall rank':'Happiness Rank', 'Country or region' : 'Country', 'Score' : 'Happiness Score',
-                                      'GDP per capita' : 'Economy (GDP per Capita)', 'Social support' : 'Family',
-                                      'Healthy life expectancy' : 'Health (Life Expectancy)','Freedom to make life choices' : 'Freedom',
-                                      'Generosity_y':'Generosity','Perceptions of corruption' : 'Trust (Government Corruption)'})
-#adding a column with the year to which the data relate
-data2018['Year'] = 2018
-
-column = ['Happiness Score','Economy (GDP per Capita)', 'Family', 'Health (Life Expectancy)',
-         'Freedom','Trust (Government Corruption)','Generosity']
-    
-data2018[column] = (data2018[column] - data2018[column].min()) / (data2018[column].max() - data2018[column].min())    
-
-#showing the data 
+#showing the data
 data2018.sort_values(by=['Happiness Rank']).head(5)
 
 
 # In[6]:
 
 
-#data loading
-data2019=pd.read_csv('./2019.csv')
+data2019 = frames[2019]
 
 #displaying data information
 data2019.info()
 
-#inclusion of information about the region based on previously implemented data
-data2019 = pd.merge(data2016, data2019, how="inner", left_on='Country', right_on='Country or region')
-
-data2019=data2019[['Country or region','Region','Overall rank', 'Score','GDP per capita','Social support', 'Healthy life expectancy',
-                  'Freedom to make life choices','Generosity_y','Perceptions of corruption']]  
-
-#renaming columns
-data2019 = data2019.rename(columns = {'Overall rank':'Happiness Rank', 'Country or region' : 'Country', 'Score' : 'Happiness Score',
-                                      'GDP per capita' : 'Economy (GDP per Capita)', 'Social support' : 'Family',
-                                      'Healthy life expectancy' : 'Health (Life Expectancy)','Freedom to make life choices' : 'Freedom',
-                                      'Generosity_y':'Generosity','Perceptions of corruption' : 'Trust (Government Corruption)'})
-
-#adding a column with the year to which the data relate
-data2019['Year'] = 2019 
-
-#data normalization
-column = ['Happiness Score','Economy (GDP per Capita)', 'Family', 'Health (Life Expectancy)',
-         'Freedom','Trust (Government Corruption)','Generosity']
-    
-data2019[column] = (data2019[column] - data2019[column].min()) / (data2019[column].max() - data2019[column].min())    
-
 #showing the data
 data2019.sort_values(by=['Happiness Rank']).head(5)
 
@@ -244,31 +154,12 @@ data2019.sort_values(by=['Happiness Rank']).head(5)
 # In[7]:
 
 
-#data loading
-data2020=pd.read_csv('./2020.csv')
+data2020 = frames[2020]
 
 #displaying data information
 data2020.info()
 
-#recalculation and attachment of data on the happiness index in 2020 based on the "Happiness Score" column
-data2020['Happiness Rank'] =  range(1, len(data2020.index)+1)
-
-#renaming columns
-data2020 = data2020.rename(columns = {'Country name' : 'Country','Regional indicator':'Region', 'Happiness Rank': 'Happiness Rank', 'Ladder score' : 'Happiness Score', 
-                                      'Logged GDP per capita' : 'Economy (GDP per Capita)', 'Social support' : 'Family', 'Healthy life expectancy' : 'Health (Life Expectancy)',
-                                      'Freedom to make life choices' : 'Freedom', 'Perceptions of corruption' : 'Trust (Government Corruption)'})
-
-#adding a column with the year to which the data relate
-data2020['Year'] = 2020 
-
-
-#data normalization
-column = ['Happiness Score','Economy (GDP per Capita)', 'Family', 'Health (Life Expectancy)',
-         'Freedom','Trust (Government Corruption)','Generosity']
-    
-data2020[column] = (data2020[column] - data2020[column].min()) / (data2020[column].max() - data2020[column].min())    
-  
-#showing the data  
+#showing the data
 data2020.sort_values(by=['Happiness Rank']).head(5)
 
 
@@ -279,24 +170,19 @@ data2020.sort_values(by=['Happiness Rank']).head(5)
 # In[8]:
 
 
-ranking = pd.DataFrame(columns = ['Country', 'Year', 'Happiness Rank', 'Happiness Score', 'Economy (GDP per Capita)',
-                                   'Family', 'Health (Life Expectancy)', 'Freedom','Trust (Government Corruption)',
-                                   'Generosity'])
-
-n = [data2015, data2016, data2017, data2018, data2019, data2020]
-
-for i in n:
-    ranking = ranking.append(i[['Region','Country', 'Year','Happiness Rank', 'Happiness Score', 'Economy (GDP per Capita)',
-                                   'Family', 'Health (Life Expectancy)', 'Freedom','Trust (Government Corruption)',
-                                   'Generosity']], ignore_index = 'True')
-    ranking = ranking.round(decimals=2)
-
-#adding the ability to display a certain number of lines
+#the yearly data frames were collected with a single concatenation in In[2] (happiness.build_ranking),
+#the values are rounded only for display
+#interactive tables, adding the ability to display a certain number of lines
+opt = backends.itables_options()
 opt.lengthMenu = [5, 10, 20, 50, 100, 200, 500]
 opt.maxBytes = 2**20
 
+#memory held by the yearly data frames and by ranking, by kind of column (compact layout: category, int16, float32)
+from happiness import memory_report
+print(memory_report({'years': frames, 'ranking': ranking}).round(3))
+
 ranking.info()
-ranking
+ranking.round(decimals=2)
 
 
 # ### Data visualization on the map
@@ -310,66 +196,19 @@ ranking
 # In[9]:
 
 
-#creating a "slider" with years
-data_slider = []
-for year in ranking.Year.unique():
-
-    ranking1 = ranking[(ranking['Year']== year )] 
-    
-    #data transformation into string data
-    for col in ranking1.columns:
-        ranking1[col] = ranking1[col].astype(str)
-    
-    
-    ranking1['text'] = 'Region: ' + ranking1['Region']+ '<br>' +     'Happiness Score: ' + ranking1['Happiness Score']+ '<br>' +     'Economy (GDP per Capita): ' + ranking1['Economy (GDP per Capita)']+ '<br>' +     'Family: ' + ranking1['Family']+ '<br>' +     'Health (Life Expectancy): ' + ranking1['Health (Life Expectancy)']+ '<br>' +     'Freedom: ' + ranking1['Freedom']+ '<br>' +     'Trust (Government Corruption): ' + ranking1['Trust (Government Corruption)']+ '<br>' +     'Generosity: ' + ranking1['Generosity']
-    
-    
-    data_by_year = dict(type = 'choropleth', 
-           colorscale = 'viridis',
-           z = ranking1['Happiness Rank'],
-           locations = 'Country: ' + ranking1['Country'],
-           locationmode = 'country names',
-           text = ranking1['text'], 
-           marker = dict(    
-           line = dict (
-                color = 'lightgrey', 
-                width = 0.5) ),
-           colorbar = dict(
-                        title = 'Place in the ranking',
-           titlefont=dict(size=15),
-           title_font_family="Times New Roman",
-           title_font_color="slategray")) 
-   
-    data_slider.append(data_by_year)
-
-#creating steps for a "slider" with years
-steps = []
-
-for i in range(len(data_slider)):
-    step = dict(method='restyle',
-                args=['visible', [False] * len(data_slider)],
-                #creating labels for "slider"
-                label='Year {}'.format(i + 2015))
-    step['args'][1][i] = True
-    steps.append(step)
-   
-
-	
-
-sliders = [dict(active=0, pad={"t": 1}, steps=steps)]
-
-layout = dict(title = 'Life satisfaction ranking',
-             titlefont=dict(size=30),
-             title_font_family="Times New Roman",
-             title_font_color="lightgrey",
-             geo = dict(showframe = True, 
-                       projection = {'type': 'natural earth'}),
-              sliders=sliders)
-
-fig = dict(data=data_slider, layout=layout) 
+#plotly.offline.iplot, recorded as the 'iplot' stage when profiling is on (HAPPINESS_PROFILE)
+iplot = backends.iplot
+
+#the figure specs are memoized: running a map cell again with the same panel builds nothing
+from happiness.specs import spec_cache
+
+specs = spec_cache()
+
+fig = specs.figure(ranking, 'map', indicator='Happiness Rank', title='Life satisfaction ranking',
+                   colorbar='Place in the ranking', hover='full')
 
 #map display
-plotly.offline.iplot(fig)
+iplot(fig)
 
 
 # # Economics (Gross Domestic Product per 1 inhabitant)
@@ -377,62 +216,10 @@ plotly.offline.iplot(fig)
 # In[10]:
 
 
-#creating a "slider" with years
-data_slider = []
-for year in ranking.Year.unique():
-
-    ranking1 = ranking[(ranking['Year']== year )] 
-    
-    #data transformation into string data
-    for col in ranking1.columns: 
-        ranking1[col] = ranking1[col].astype(str)
-    
-    ranking1['text'] = 'Region: ' + ranking1['Region']
-     
-    data_by_year = dict(type = 'choropleth', 
-           colorscale = 'viridis',
-           z = ranking1['Economy (GDP per Capita)'],
-           locations = 'Country: ' + ranking1['Country'],
-           locationmode = 'country names',
-           text = ranking1['text'],
-           marker = dict(
-           line = dict (
-                color = 'lightgrey', 
-                width = 0.5) ),
-           colorbar = dict(
-                        title = 'Indicator',
-           titlefont=dict(size=15),
-           title_font_family="Times New Roman",
-           title_font_color="slategray")) 
-   
-    data_slider.append(data_by_year)
-
-#creating steps for a "slider" with years
-steps = []
-
-for i in range(len(data_slider)):
-    step = dict(method='restyle',
-                args=['visible', [False] * len(data_slider)],
-                #creating labels for "slider"
-                label='Year {}'.format(i + 2015))
-    step['args'][1][i] = True
-    steps.append(step)
-   
-
-	
-sliders = [dict(active=0, pad={"t": 1}, steps=steps)]
-
-layout = dict(title = 'Economy (Gross Domestic Product per 1 inhabitant)',
-             titlefont=dict(size=30),
-             title_font_family="Times New Roman",
-             title_font_color="lightgrey",
-             geo = dict(showframe = True, 
-                       projection = {'type': 'natural earth'}),
-              sliders=sliders)
-
-fig = dict(data=data_slider, layout=layout) 
-
-plotly.offline.iplot(fig)
+fig = specs.figure(ranking, 'map', indicator='Economy (GDP per Capita)',
+                   title='Economy (Gross Domestic Product per 1 inhabitant)')
+
+iplot(fig)
 
 
 # # Freedom
@@ -440,62 +227,9 @@ plotly.offline.iplot(fig)
 # In[11]:
 
 
-#creating a "slider" with years
-data_slider = []
-for year in ranking.Year.unique():
-
-    ranking1 = ranking[(ranking['Year']== year )] 
-    
-    #data transformation into string data
-    for col in ranking1.columns:
-        ranking1[col] = ranking1[col].astype(str)
-
-    ranking1['text'] = 'Region: ' + ranking1['Region']
-       
-    data_by_year = dict(type = 'choropleth', 
-           colorscale = 'viridis',
-           z = ranking1['Freedom'],
-           locations = 'Country: ' + ranking1['Country'],
-           locationmode = 'country names',
-           text = ranking1['text'],
-           marker = dict( 
-           line = dict (
-                color = 'lightgrey', 
-                width = 0.5) ),
-           colorbar = dict(
-                        title = 'Indicator',
-           titlefont=dict(size=15),
-           title_font_family="Times New Roman",
-           title_font_color="slategray")) 
-   
-    data_slider.append(data_by_year)
-
-#creating steps for a "slider" with years
-steps = []
-
-for i in range(len(data_slider)):
-    step = dict(method='restyle',
-                args=['visible', [False] * len(data_slider)],
-                #creating labels for "slider"
-                label='Year {}'.format(i + 2015))
-    step['args'][1][i] = True
-    steps.append(step)
-   
-
-	
-sliders = [dict(active=0, pad={"t": 1}, steps=steps)]
-
-layout = dict(title = 'Freedom',
-             titlefont=dict(size=30),
-             title_font_family="Times New Roman",
-             title_font_color="lightgrey",
-             geo = dict(showframe = True, 
-                       projection = {'type': 'natural earth'}),
-             sliders=sliders)
-
-fig = dict(data=data_slider, layout=layout) 
-
-plotly.offline.iplot(fig)
+fig = specs.figure(ranking, 'map', indicator='Freedom', title='Freedom')
+
+iplot(fig)
 
 
 # # Trust (Government Corruption)
@@ -503,62 +237,9 @@ plotly.offline.iplot(fig)
 # In[12]:
 
 
-#creating a "slider" with years
-data_slider = []
-for year in ranking.Year.unique():
-
-    ranking1 = ranking[(ranking['Year']== year )] 
-    
-    #data transformation into string data
-    for col in ranking1.columns:
-        ranking1[col] = ranking1[col].astype(str)
-        
-    ranking1['text'] = 'Region: ' + ranking1['Region']   
-        
-    data_by_year = dict(type = 'choropleth', 
-           colorscale = 'viridis',
-           z = ranking1['Trust (Government Corruption)'],
-           locations = 'Country: ' + ranking1['Country'],
-           locationmode = 'country names',
-           text = ranking1['text'],
-           marker = dict( 
-           line = dict (
-                color = 'lightgrey', 
-                width = 0.5) ),
-           colorbar = dict(
-                        title = 'Indicator',
-           titlefont=dict(size=15),
-           title_font_family="Times New Roman",
-           title_font_color="slategray")) 
-   
-    data_slider.append(data_by_year)
-
-#creating steps for a "slider" with years
-steps = []
-
-for i in range(len(data_slider)):
-    step = dict(method='restyle',
-                args=['visible', [False] * len(data_slider)],
-                #creating labels for "slider"
-                label='Year {}'.format(i + 2015))
-    step['args'][1][i] = True
-    steps.append(step)
-   
-
-	
-sliders = [dict(active=0, pad={"t": 1}, steps=steps)]
-
-layout = dict(title = 'Trust (Government Corruption)',
-             titlefont=dict(size=30),
-             title_font_family="Times New Roman",
-             title_font_color="lightgrey",
-             geo = dict(showframe = True, 
-                       projection = {'type': 'natural earth'}),
-             sliders=sliders)
-
-fig = dict(data=data_slider, layout=layout) 
-
-plotly.offline.iplot(fig)
+fig = specs.figure(ranking, 'map', indicator='Trust (Government Corruption)', title='Trust (Government Corruption)')
+
+iplot(fig)
 
 
 # # Zdrowie (oczekiwana długość życia)
@@ -566,62 +247,9 @@ plotly.offline.iplot(fig)
 # In[13]:
 
 
-#creating a "slider" with years
-data_slider = []
-for year in ranking.Year.unique():
-
-    ranking1 = ranking[(ranking['Year']== year )] 
-    
-    #data transformation into string data
-    for col in ranking1.columns:
-        ranking1[col] = ranking1[col].astype(str)
-        
-    ranking1['text'] = 'Region: ' + ranking1['Region']   
-        
-    data_by_year = dict(type = 'choropleth', 
-           colorscale = 'viridis',
-           z = ranking1['Health (Life Expectancy)'],
-           locations = 'Country: ' + ranking1['Country'],
-           locationmode = 'country names',
-           text = ranking1['text'],
-           marker = dict( 
-           line = dict (
-                color = 'lightgrey', 
-                width = 0.5) ),
-           colorbar = dict(
-                        title = 'Indicator',
-           titlefont=dict(size=15),
-           title_font_family="Times New Roman",
-           title_font_color="slategray")) 
-   
-    data_slider.append(data_by_year)
-
-#creating steps for a "slider" with years
-steps = []
-
-for i in range(len(data_slider)):
-    step = dict(method='restyle',
-                args=['visible', [False] * len(data_slider)],
-                #creating labels for "slider"
-                label='Year {}'.format(i + 2015))
-    step['args'][1][i] = True
-    steps.append(step)
-   
-
-	
-sliders = [dict(active=0, pad={"t": 1}, steps=steps)]
-
-layout = dict(title = 'Health (life expectancy)',
-             titlefont=dict(size=30),
-             title_font_family="Times New Roman",
-             title_font_color="lightgrey",
-             geo = dict(showframe = True, 
-                       projection = {'type': 'natural earth'}),
-             sliders=sliders)
-
-fig = dict(data=data_slider, layout=layout) 
-
-plotly.offline.iplot(fig)
+fig = specs.figure(ranking, 'map', indicator='Health (Life Expectancy)', title='Health (life expectancy)')
+
+iplot(fig)
 
 
 # ### Identifying dependencies between pointers
@@ -631,16 +259,24 @@ plotly.offline.iplot(fig)
 # In[14]:
 
 
-opt.lengthMenu = [7]
-ranking.corr()
+#the correlation matrix is computed once on the numeric indicators and reused by the heatmap below
+from happiness.correlation import Correlations
+
+correlations = Correlations(ranking)
+
+opt.lengthMenu = [8]
+correlations.matrix()
 
 
 # In[15]:
 
 
+plt = backends.pyplot()
+sns = backends.seaborn()
+
 #creating a correlation heatmap
 y,ax = plt.subplots(figsize=(8, 7))
-sns.heatmap(ranking.corr(),annot=True, linewidths=2.50, fmt= '.1f',ax=ax, cmap="viridis")
+sns.heatmap(correlations.matrix(),annot=True, linewidths=2.50, fmt= '.1f',ax=ax, cmap="viridis")
 plt.xticks(rotation=80) 
 ax.set_title("Correlation between indicators",font="Times New Roman", fontsize=30, color ='slategray', pad=25)
 
@@ -656,76 +292,21 @@ plt.show()
 # In[16]:
 
 
-df2015 = data2015.iloc[:10,:]
-df2016 = data2016.iloc[:10,:]
-df2017 = data2017.iloc[:10,:]
-df2018 = data2018.iloc[:10,:]
-df2019 = data2019.iloc[:10,:]
-df2020 = data2020.iloc[:10,:]
+#the 10 best ranked countries of every year, chosen by "Happiness Rank", in long format (one row per indicator)
+from happiness.topn import top_n, long_format, top_scatter_figure, comparison_figures
+
+top = top_n(ranking, 10)
+long = long_format(top)
+
+top.round(decimals=2)
 
 
 # In[17]:
 
 
-trace1 =go.Scatter(
-                    x = df2015['Country'],
-                    y = df2015['Happiness Score'],
-                    mode = "markers",
-                    name = "2015",
-                    marker = dict(color ="#481567"),
-                    text= df2015.Country)
-trace1
-# creation trace2
-trace2 =go.Scatter(
-                    x = df2016['Country'],
-                    y = df2016['Happiness Score'],
-                    mode = "markers",
-                    name = "2016",
-                    marker = dict(color = "#33638D"),
-                    text= df2016.Country)
-# creation trace3
-trace3 =go.Scatter(
-                    x = df2017['Country'],
-                    y = df2017['Happiness Score'],
-                    mode = "markers",
-                    name = "2017",
-                    marker = dict(color = '#238A8D'),
-                    text= df2017.Country)
-
-# creation trace4
-trace4 =go.Scatter(
-                    x = df2018['Country'],
-                    y = df2018['Happiness Score'],
-                    mode = "markers",
-                    name = "2018",
-                    marker = dict(color = '#29AF7F'),
-                    text= df2018.Country)
-
-# creation trace5
-trace5 =go.Scatter(
-                    x = df2019['Country'],
-                    y = df2019['Happiness Score'],
-                    mode = "markers",
-                    name = "2019",
-                    marker = dict(color = '#B8DE29'),
-                    text= df2019.Country)
-
-# creation trace6
-trace6 =go.Scatter(
-                    x = df2020['Country'],
-                    y = df2020['Happiness Score'],
-                    mode = "markers",
-                    name = "2020",
-                    marker = dict(color = '#FDE725'),
-                    text= df2020.Country)
-
-data = [trace1, trace2, trace3, trace4, trace5,trace6]
-layout = dict(title = 'Happiness level change for the top 10 countries',
-              xaxis= dict(title= 'Country',ticklen= 5,zeroline= False),
-              yaxis= dict(title= 'Happiness indicator',ticklen= 5,zeroline= False),
-              hovermode="x unified"
-             )
-fig = dict(data = data, layout = layout)
+iplot = backends.iplot
+
+fig = top_scatter_figure(long)
 iplot(fig)
 
 
@@ -740,41 +321,10 @@ iplot(fig)
 # In[18]:
 
 
-trace1 = go.Scatter(x = df2015['Country'],
-                    y = df2015['Economy (GDP per Capita)'],
-                    mode = "lines+markers",
-                    name = "Economy (GDP per Capita)",
-                    marker = dict(color = '#481567'),
-                    text= df2015.Country)
-
-trace2 = go.Scatter(x = df2015['Country'],
-                    y = df2015['Freedom'],
-                    mode = "lines+markers",
-                    name = "Freedom",
-                    marker = dict(color = '#33638D'),
-                    text= df2015.Country)
-
-trace3 = go.Scatter(x = df2015['Country'],
-                    y = df2015['Trust (Government Corruption)'],
-                    mode = "lines+markers",
-                    name = "Trust (Government Corruption)",
-                    marker = dict(color = '#238A8D'),
-                    text= df2015.Country)
- 
-trace4 = go.Scatter(x = df2015['Country'],
-                    y = df2015['Health (Life Expectancy)'],
-                    mode = "lines+markers",
-                    name = "Health (Life Expectancy)",
-                    marker = dict(color = '#FDE725'),
-                    text= df2015.Country)
-
-
-data = [trace1, trace2, trace3, trace4]
-layout = dict(title = 'GDP - Freedom - Trust in the government - Life expectancy' + '<br>' + 'Comparison for the 10 happiest countries in 2015',
-              xaxis= dict(title= 'Kraje',ticklen= 5,zeroline= False),
-              hovermode="x unified")
-fig = dict(data = data, layout = layout)
-iplot(fig)
+#the comparison charts of all the years are generated together from the long format data
+comparisons = comparison_figures(long)
+
+iplot(comparisons[2015])
 
 
 # ## Comparison of the values of GDP, Freedom, Trust in government, Life expectancy in the top 10 countries in 2016
@@ -782,41 +332,7 @@ iplot(fig)
 # In[19]:
 
 
-trace1 = go.Scatter(x = df2016['Country'],
-                    y = df2016['Economy (GDP per Capita)'],
-                    mode = "lines+markers",
-                    name = "Economy (GDP per Capita)",
-                    marker = dict(color = '#481567'),
-                    text= df2016.Country)
-
-trace2 = go.Scatter(x = df2016['Country'],
-                    y = df2016['Freedom'],
-                    mode = "lines+markers",
-                    name = "Freedom",
-                    marker = dict(color = '#33638D'),
-                    text= df2016.Country)
-
-trace3 = go.Scatter(x = df2016['Country'],
-                    y = df2016['Trust (Government Corruption)'],
-                    mode = "lines+markers",
-                    name = "Trust (Government Corruption)",
-                    marker = dict(color = '#238A8D'),
-                    text= df2016.Country)
-
-trace4 = go.Scatter(x = df2016['Country'],
-                    y = df2016['Health (Life Expectancy)'],
-                    mode = "lines+markers",
-                    name = "Health (Life Expectancy)",
-                    marker = dict(color = '#FDE725'),
-                    text= df2016.Country)
-
-
-data = [trace1, trace2, trace3, trace4]
-layout = dict(title = 'GDP - Freedom - Trust in the government - Life expectancy' + '<br>' + 'Comparison for the 10 happiest countries in 2016',
-              xaxis= dict(title= 'Kraje',ticklen= 5,zeroline= False),
-              hovermode="x unified")
-fig = dict(data = data, layout = layout)
-iplot(fig)
+iplot(comparisons[2016])
 
 
 # ## Comparison of the values of GDP, Freedom, Trust in government, Life expectancy in the top 10 countries in 2017
@@ -824,41 +340,7 @@ iplot(fig)
 # In[20]:
 
 
-trace1 = go.Scatter(x = df2017['Country'],
-                    y = df2017['Economy (GDP per Capita)'],
-                    mode = "lines+markers",
-                    name = "Economy (GDP per Capita)",
-                    marker = dict(color = '#481567'),
-                    text= df2017.Country)
-
-trace2 = go.Scatter(x = df2017['Country'],
-                    y = df2017['Freedom'],
-                    mode = "lines+markers",
-                    name = "Freedom",
-                    marker = dict(color = '#33638D'),
-                    text= df2017.Country)
-
-trace3 = go.Scatter(x = df2017['Country'],
-                    y = df2017['Trust (Government Corruption)'],
-                    mode = "lines+markers",
-                    name = "Trust (Government Corruption)",
-                    marker = dict(color = '#238A8D'),
-                    text= df2017.Country)
-
-trace4 = go.Scatter(x = df2017['Country'],
-                    y = df2017['Health (Life Expectancy)'],
-                    mode = "lines+markers",
-                    name = "Health (Life Expectancy)",
-                    marker = dict(color = '#FDE725'),
-                    text= df2017.Country)
-
-
-data = [trace1, trace2, trace3, trace4]
-layout = dict(title = 'GDP - Freedom - Trust in the government - Life expectancy' + '<br>' + 'Comparison for the 10 happiest countries in 2017',
-              xaxis= dict(title= 'Kraje',ticklen= 5,zeroline= False),
-              hovermode="x unified")
-fig = dict(data = data, layout = layout)
-iplot(fig)
+iplot(comparisons[2017])
 
 
 # ## PComparison of the values of GDP, Freedom, Trust in government, Life expectancy in the top 10 countries in 2018
@@ -866,41 +348,7 @@ iplot(fig)
 # In[21]:
 
 
-trace1 = go.Scatter(x = df2018['Country'],
-                    y = df2018['Economy (GDP per Capita)'],
-                    mode = "lines+markers",
-                    name = "Economy (GDP per Capita)",
-                    marker = dict(color = '#481567'),
-                    text= df2018.Country)
-
-trace2 = go.Scatter(x = df2018['Country'],
-                    y = df2018['Freedom'],
-                    mode = "lines+markers",
-                    name = "Freedom",
-                    marker = dict(color = '#33638D'),
-                    text= df2018.Country)
-
-trace3 = go.Scatter(x = df2018['Country'],
-                    y = df2018['Trust (Government Corruption)'],
-                    mode = "lines+markers",
-                    name = "Trust (Government Corruption)",
-                    marker = dict(color = '#238A8D'),
-                    text= df2018.Country)
-
-trace4 = go.Scatter(x = df2018['Country'],
-                    y = df2018['Health (Life Expectancy)'],
-                    mode = "lines+markers",
-                    name = "Health (Life Expectancy)",
-                    marker = dict(color = '#FDE725'),
-                    text= df2018.Country)
-
-
-data = [trace1, trace2, trace3, trace4]
-layout = dict(title = 'GDP - Freedom - Trust in the government - Life expectancy' + '<br>' + 'Comparison for the 10 happiest countries in 2018',
-              xaxis= dict(title= 'Kraje',ticklen= 5,zeroline= False),
-              hovermode="x unified")
-fig = dict(data = data, layout = layout)
-iplot(fig)
+iplot(comparisons[2018])
 
 
 # ## Comparison of the values of GDP, Freedom, Trust in government, Life expectancy in the top 10 countries in 2019
@@ -908,41 +356,7 @@ iplot(fig)
 # In[22]:
 
 
-trace1 = go.Scatter(x = df2019['Country'],
-                    y = df2019['Economy (GDP per Capita)'],
-                    mode = "lines+markers",
-                    name = "Economy (GDP per Capita)",
-                    marker = dict(color = '#481567'),
-                    text= df2019.Country)
-
-trace2 = go.Scatter(x = df2019['Country'],
-                    y = df2019['Freedom'],
-                    mode = "lines+markers",
-                    name = "Freedom",
-                    marker = dict(color = '#33638D'),
-                    text= df2019.Country)
-
-trace3 = go.Scatter(x = df2019['Country'],
-                    y = df2019['Trust (Government Corruption)'],
-                    mode = "lines+markers",
-                    name = "Trust (Government Corruption)",
-                    marker = dict(color = '#238A8D'),
-                    text= df2019.Country)
-
-trace4 = go.Scatter(x = df2019['Country'],
-                    y = df2019['Health (Life Expectancy)'],
-                    mode = "lines+markers",
-                    name = "Health (Life Expectancy)",
-                    marker = dict(color = '#FDE725'),
-                    text= df2019.Country)
-
-
-data = [trace1, trace2, trace3, trace4]
-layout = dict(title = 'GDP - Freedom - Trust in government - Life expectancy' + '<br>' + 'Comparison for the 10 happiest countries in 2019',
-              xaxis= dict(title= 'Kraje',ticklen= 5,zeroline= False),
-              hovermode="x unified")
-fig = dict(data = data, layout = layout)
-iplot(fig)
+iplot(comparisons[2019])
 
 
 # ## Comparison of the values of GDP, Freedom, Trust in government, Life expectancy in the top 10 countries in 2020
@@ -950,41 +364,7 @@ iplot(fig)
 # In[23]:
 
 
-trace1 = go.Scatter(x = df2020['Country'],
-                    y = df2020['Economy (GDP per Capita)'],
-                    mode = "lines+markers",
-                    name = "Economy (GDP per Capita)",
-                    marker = dict(color = '#481567'),
-                    text= df2019.Country)
-
-trace2 = go.Scatter(x = df2020['Country'],
-                    y = df2020['Freedom'],
-                    mode = "lines+markers",
-                    name = "Freedom",
-                    marker = dict(color = '#33638D'),
-                    text= df2019.Country)
-
-trace3 = go.Scatter(x = df2020['Country'],
-                    y = df2020['Trust (Government Corruption)'],
-                    mode = "lines+markers",
-                    name = "Trust in the government",
-                    marker = dict(color = '#238A8D'),
-                    text= df2020.Country)
-
-trace4 = go.Scatter(x = df2020['Country'],
-                    y = df2020['Health (Life Expectancy)'],
-                    mode = "lines+markers",
-                    name = "Health (Life Expectancy)",
-                    marker = dict(color = '#FDE725'),
-                    text= df2020.Country)
-
-
-data = [trace1, trace2, trace3, trace4]
-layout = dict(title = 'GDP - Freedom - Trust in government - Life expectancy' + '<br>' + 'Comparison for the 10 happiest countries in 2019',
-              xaxis= dict(title= 'Kraje',ticklen= 5,zeroline= False),
-              hovermode="x unified")
-fig = dict(data = data, layout = layout)
-iplot(fig)
+iplot(comparisons[2020])
 
 
 # # Conclusions
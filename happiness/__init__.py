@@ -0,0 +1,19 @@
+"""Data preparation for the World Happiness Report 2015-2020 analysis.
+
+The classes caching their results (``Correlations``, ``Trends``,
+``SimilarityIndex``, ``Profiles``, ``specs.SpecCache``) return the cached
+data frames and figure dicts themselves: they are shared and should be copied
+before being modified.
+"""
+
+from .schema import COLUMNS, INDICATORS, YEARS, YearSchema, register
+from .countries import CountryIndex, UnmatchedCountryWarning, country_index
+from .normalize import SCALERS, normalize_panel
+from .loader import DATA_DIR, load_year, load_years, read_year
+from .panel import build_ranking, compact, empty_ranking, memory_report
+from .cache import CACHE_DIR, load_panel, load_year_cached
+from .store import PanelStore
+from .trends import Trends
+from .parallel import pmap
+from .similarity import SimilarityIndex
+from .clusters import Profiles
@@ -0,0 +1,153 @@
+"""Per-year artefacts of the figures: map partition, top rows and correlation matrices.
+
+Every year is normalized on its own, so these depend only on the rows of
+their year. ``YearArtefacts`` keeps them per year under the content hash of
+those rows and ``refresh`` builds them only for the new and changed years.
+With a ``directory`` they are also kept as Feather files (``map-<year>-<key>``,
+``top-<year>-<key>``, ``corr-<year>-<key>``), so once
+``python -m happiness.incremental 2021`` has run, the next report reads the
+earlier years instead of computing them::
+
+    artefacts = YearArtefacts(ranking, directory=CACHE_DIR)
+    artefacts.partitions()         # map partitions in year order
+    artefacts.top(10)              # the 10 best ranked countries of every year
+    artefacts.correlations()       # {year: correlation matrix}
+    artefacts.refresh(ranking)     # after a year was appended: [2021]
+"""
+
+import collections
+
+import pandas as pd
+
+from .cache import _path, read_frame, remove_stale, write_frame
+from .correlation import Correlations
+from .maps import YearPartition
+from .panel import content_hash, empty_ranking
+from .profiling import profiled
+from .schema import COLUMNS, INDICATORS
+from .topn import top_n
+
+#number of top rows kept in the files (other numbers are computed from the rows of the year)
+TOP = 10
+
+NAMES = ('map', 'top', 'corr')
+
+
+class _Year(object):
+    """Artefacts of one year."""
+
+    def __init__(self, year, key, data):
+        self.year = year
+        self.key = key
+        self.data = data
+        self.partition = None
+        self.top = {}
+        self.corr = {}
+
+
+class YearArtefacts(object):
+    """Map partitions, top rows and correlation matrices of every year of ``ranking``.
+
+    ``counts`` has the number of years taken from memory (``reused``), read
+    from ``directory`` (``read``) and computed (``built``).
+    """
+
+    def __init__(self, ranking=None, directory=None):
+        self.directory = directory
+        self.counts = collections.Counter()
+        self.dtypes = None
+        self._years = {}
+        if ranking is not None:
+            self.refresh(ranking)
+
+    @property
+    def years(self):
+        return sorted(self._years)
+
+    def refresh(self, ranking, years=None):
+        """Take the data of ``ranking`` (of its ``years`` only when given), building the artefacts
+        of the new and changed years. Returns the list of the years built."""
+        self.dtypes = ranking.dtypes
+        present, missing = set(), []
+        for year, data in ranking.groupby('Year', sort=True, observed=True):
+            year = int(year)
+            present.add(year)
+            if years is not None and year not in years:
+                continue
+            key = content_hash(data, COLUMNS)
+            if year in self._years and self._years[year].key == key:
+                self.counts['reused'] += 1
+                continue
+            entry = _Year(year, key, data.reset_index(drop=True))
+            if self._read(entry):
+                self.counts['read'] += 1
+            else:
+                missing.append(entry)
+            self._years[year] = entry
+        if years is None:
+            for year in set(self._years) - present:
+                del self._years[year]
+        if missing:
+            self._build(missing)
+            self.counts['built'] += len(missing)
+        return [entry.year for entry in missing]
+
+    def _files(self, entry):
+        return {name: _path(self.directory, '{}-{}-{}'.format(name, entry.year, entry.key)) for name in NAMES}
+
+    def _read(self, entry):
+        if self.directory is None:
+            return False
+        frames = {name: read_frame(path) for name, path in self._files(entry).items()}
+        if any(frame is None for frame in frames.values()):
+            return False
+        entry.partition = YearPartition(entry.year, frames['map'])
+        entry.top[TOP] = frames['top']
+        entry.corr['pearson'] = frames['corr'].set_index('Indicator').rename_axis(None)
+        return True
+
+    @profiled('year_artefacts')
+    def _build(self, entries):
+        #the correlation matrices of all the years built, in one batched pass
+        rows = pd.concat([entry.data for entry in entries], ignore_index=True)
+        matrices = Correlations(rows, cache=False).by('Year')
+        for entry in entries:
+            entry.partition = YearPartition(entry.year, entry.data)
+            entry.top[TOP] = top_n(entry.data, TOP)
+            entry.corr['pearson'] = matrices[entry.year]
+            if self.directory is None:
+                continue
+            frames = {'map': entry.data[['Country', 'Region', 'Happiness Rank'] + INDICATORS],
+                      'top': entry.top[TOP],
+                      'corr': entry.corr['pearson'].rename_axis('Indicator').reset_index()}
+            for name, path in self._files(entry).items():
+                write_frame(frames[name], path)
+                remove_stale(self.directory, '{}-{}-'.format(name, entry.year), keep=[path])
+
+    def partitions(self):
+        """Map partitions of the years, in year order (see ``maps.map_partitions``)."""
+        return [self._years[year].partition for year in self.years]
+
+    def top(self, n=TOP):
+        """Rows of the ``n`` best ranked countries of every year, the same as ``topn.top_n(ranking, n)``."""
+        frames = []
+        for year in self.years:
+            entry = self._years[year]
+            if n not in entry.top:
+                entry.top[n] = top_n(entry.data, n)
+            frames.append(entry.top[n])
+        if not frames:
+            return empty_ranking()
+        #the rows read from the files get the categories of the current ranking back
+        return pd.concat(frames, ignore_index=True).astype(self.dtypes[COLUMNS].to_dict())
+
+    def correlations(self, method='pearson'):
+        """Correlation matrix of ``correlation.CORR_COLUMNS`` of every year, ``{year: data frame}``,
+        the same as ``Correlations(ranking).by('Year', method=method)``."""
+        missing = [entry for entry in self._years.values() if method not in entry.corr]
+        if missing:
+            rows = pd.concat([entry.data for entry in missing], ignore_index=True)
+            matrices = Correlations(rows, cache=False).by('Year', method=method)
+            for entry in missing:
+                entry.corr[method] = matrices[entry.year]
+        return {year: self._years[year].corr[method] for year in self.years}
@@ -0,0 +1,114 @@
+"""Lazy access to the visualization libraries.
+
+The data preparation (``happiness`` loader, cache, normalization) needs only
+pandas and NumPy. Plotly, Matplotlib, seaborn and itables are imported the
+first time a chart or an interactive table is requested, so a job that only
+needs ``ranking`` does not pay for them.
+
+``python -m happiness.backends`` measures the cold start of the data-only path
+in a fresh interpreter and fails when it is over the budget or when it pulled
+in one of the visualization libraries.
+"""
+
+import importlib
+import json
+import subprocess
+import sys
+
+from .profiling import stage
+
+#libraries that must not be imported by the data-only path
+HEAVY_MODULES = ('geopandas', 'matplotlib', 'plotly', 'chart_studio', 'seaborn', 'itables')
+
+#cold start budget of the data-only path (import + load_panel from a warm cache), in seconds
+COLD_START_BUDGET = 1.5
+
+_modules = {}
+
+
+def _load(name):
+    if name not in _modules:
+        _modules[name] = importlib.import_module(name)
+    return _modules[name]
+
+
+def plotly_offline():
+    """``plotly.offline`` (figure rendering in the notebook and to html)."""
+    return _load('plotly.offline')
+
+
+def iplot(figure, **kwargs):
+    """``plotly.offline.iplot`` of ``figure``, recorded as the profiling stage ``iplot``
+    (the serialization of the figure into the notebook)."""
+    with stage('iplot'):
+        return plotly_offline().iplot(figure, **kwargs)
+
+
+def graph_objs():
+    """``plotly.graph_objs``."""
+    return _load('plotly.graph_objs')
+
+
+def pyplot():
+    """``matplotlib.pyplot``."""
+    return _load('matplotlib.pyplot')
+
+
+def seaborn():
+    """``seaborn``."""
+    return _load('seaborn')
+
+
+def itables(all_interactive=True):
+    """``itables`` with the notebook mode switched on (interactive tables)."""
+    if 'itables' not in _modules:
+        module = _load('itables')
+        module.init_notebook_mode(all_interactive=all_interactive)
+    return _modules['itables']
+
+
+def itables_options():
+    """``itables.options`` (display options of the interactive tables)."""
+    itables()
+    return _load('itables.options')
+
+
+_COLD_START = '''
+import json, resource, sys, time
+start = time.perf_counter()
+import happiness
+imported = time.perf_counter()
+frames, ranking = happiness.load_panel()
+loaded = time.perf_counter()
+print(json.dumps({
+    'import_seconds': imported - start,
+    'seconds': loaded - start,
+    'rows': len(ranking.index),
+    'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0,
+    'heavy_modules': sorted(name for name in %r if name in sys.modules),
+}))
+'''
+
+
+def cold_start():
+    """Measure the data-only path in a fresh interpreter, returns a dict with the timings."""
+    output = subprocess.check_output([sys.executable, '-c', _COLD_START % (HEAVY_MODULES,)])
+    return json.loads(output.decode('utf-8').strip().splitlines()[-1])
+
+
+def main(budget=COLD_START_BUDGET):
+    #the first run fills the cache, the second one is the measured cold start
+    cold_start()
+    result = cold_start()
+    print(json.dumps(result, indent=2))
+    if result['heavy_modules']:
+        print('visualization libraries imported by the data-only path: ' + ', '.join(result['heavy_modules']))
+        return 1
+    if result['seconds'] > budget:
+        print('cold start {:.2f} s is over the budget of {:.2f} s'.format(result['seconds'], budget))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,244 @@
+"""Benchmarks of the pipeline stages with regression tracking.
+
+Every stage (reading the csv files, resolving the countries, normalization,
+building ``ranking``, correlations, maps and top N charts) is timed on the
+six report files and on synthetic panels with 10x, 100x and 1000x more
+rows (more years and more countries, written as csv files to a temporary
+folder). The time is the best of ``--repeat`` runs, the peak memory of every
+stage comes from one extra run under tracemalloc, together with the memory
+held by the data frames the stage returns.
+
+    python -m happiness.bench --out bench.json      # 1x to 1000x, a few minutes
+    python -m happiness.bench --scales 1 10 100      # without the 1000x panel
+    python -m happiness.bench --save-baseline bench-baseline.json
+    python -m happiness.bench --baseline bench-baseline.json   # exit code 1 on a regression
+
+Everything runs offline.
+"""
+
+import argparse
+import contextlib
+import datetime
+import gc
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from .correlation import Correlations
+from .countries import country_index
+from .loader import DATA_DIR, read_year
+from .maps import choropleth_figures
+from .normalize import normalize_panel
+from .panel import build_ranking
+from .profiling import frame_bytes
+from .schema import COLUMNS, YEARS, YearSchema
+from .topn import comparison_figures, long_format, top_n, top_scatter_figure
+
+SCALES = (1, 10, 100, 1000)
+
+STAGES = ('read', 'resolve', 'normalize', 'ranking', 'corr', 'maps', 'topn')
+
+#a stage is a regression when it is slower than the baseline by this share and by at least MIN_SECONDS
+TOLERANCE = 0.25
+MIN_SECONDS = 0.005
+
+
+@contextlib.contextmanager
+def registered(schemas):
+    """Temporarily add schemas of synthetic years to the registry."""
+    saved = dict(YEARS)
+    YEARS.update((schema.year, schema) for schema in schemas)
+    try:
+        yield
+    finally:
+        YEARS.clear()
+        YEARS.update(saved)
+
+
+def synthetic_files(scale, folder, seed=0):
+    """Write a panel ``scale`` times bigger than the report as csv files, returns the schemas.
+
+    The years are multiplied (up to 10x) and the rest of the scale goes to the
+    number of countries: every country appears several times a year (told apart
+    after the resolution by a suffix) with slightly changed values. A copy of a
+    year without a region column in the report has none either, its regions
+    come from the country index as in ``load_year``.
+    """
+    rng = np.random.default_rng(seed)
+    index = country_index()
+    years = sorted(YEARS)
+    base = [index.attach(read_year(year), region=YEARS[year].region is None) for year in years]
+    year_copies = min(scale, 10)
+    country_copies = max(scale // year_copies, 1)
+    template = YEARS[2016]
+    indicators = [column for column in template.columns.values() if column != 'Country']
+
+    schemas = []
+    for copy in range(year_copies):
+        for source, data in zip(years, base):
+            year = source + len(base) * copy
+            data = pd.concat([data] * country_copies, ignore_index=True)
+            data[indicators] = data[indicators] * rng.uniform(0.95, 1.05, size=(len(data), len(indicators)))
+            data['Happiness Rank'] = np.arange(1, len(data) + 1)
+            filename = 'synthetic-{}.csv'.format(year)
+            schema = YearSchema(year, filename, template.columns, rank='Happiness Rank',
+                                region=None if YEARS[source].region is None else 'Region')
+            data[schema.usecols()].to_csv(os.path.join(folder, filename), index=False)
+            schemas.append(schema)
+    return schemas
+
+
+def _suffix(data):
+    #the copies of a country in a synthetic year become separate countries
+    copy = data.groupby('Country', sort=False).cumcount()
+    if copy.any():
+        data['Country'] = data['Country'].astype(str) + np.where(copy > 0, ' #' + copy.astype(str), '')
+    return data
+
+
+def run_stages(years, data_dir, timer):
+    """Run the pipeline once, ``timer(stage, rows, func)`` runs and measures every stage."""
+    raw = timer('read', None, lambda: [read_year(year, data_dir) for year in years])
+    rows = sum(len(data) for data in raw)
+
+    def resolve():
+        #the same steps as load_year, the years without a region column take it from the index
+        index = country_index()
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            return [_suffix(index.attach(data.copy(), region=YEARS[year].region is None))[COLUMNS]
+                    for year, data in zip(years, raw)]
+    frames = timer('resolve', rows, resolve)
+    frames = timer('normalize', rows, lambda: [normalize_panel(data.copy(), by=None) for data in frames])
+    ranking = timer('ranking', rows, lambda: build_ranking(frames))
+
+    def corr():
+        correlations = Correlations(ranking)
+        return correlations.matrix(), correlations.by('Year')
+    timer('corr', rows, corr)
+    timer('maps', rows, lambda: choropleth_figures(ranking))
+
+    def topn():
+        long = long_format(top_n(ranking, 10))
+        return top_scatter_figure(long), comparison_figures(long)
+    timer('topn', rows, topn)
+    return rows
+
+
+def bench_scale(scale, repeat=3, data_dir=DATA_DIR):
+    """Timings of every stage at one scale, ``{stage: {'seconds', 'peak_mb', 'out_mb', 'rows'}}``.
+
+    ``out_mb`` is the memory held by the data frames the stage returns (0 for figures).
+    """
+    folder = None
+    years = sorted(YEARS)
+    schemas = []
+    if scale != 1:
+        folder = tempfile.mkdtemp(prefix='happiness-bench-')
+        schemas = synthetic_files(scale, folder)
+        years = [schema.year for schema in schemas]
+        data_dir = folder
+
+    results = {stage: {'seconds': float('inf'), 'peak_mb': 0.0, 'out_mb': 0.0, 'rows': 0} for stage in STAGES}
+
+    def timed(stage, rows, func):
+        gc.collect()
+        start = time.perf_counter()
+        value = func()
+        seconds = time.perf_counter() - start
+        results[stage]['seconds'] = min(results[stage]['seconds'], seconds)
+        results[stage]['rows'] = rows if rows is not None else sum(len(data) for data in value)
+        return value
+
+    def traced(stage, rows, func):
+        gc.collect()
+        tracemalloc.start()
+        try:
+            value = func()
+            results[stage]['peak_mb'] = tracemalloc.get_traced_memory()[1] / 2.0 ** 20
+        finally:
+            tracemalloc.stop()
+        results[stage]['out_mb'] = (frame_bytes(value, deep=True) or 0) / 2.0 ** 20
+        return value
+
+    try:
+        with registered(schemas):
+            for _ in range(repeat):
+                run_stages(years, data_dir, timed)
+            run_stages(years, data_dir, traced)
+    finally:
+        if folder is not None:
+            shutil.rmtree(folder, ignore_errors=True)
+    return results
+
+
+def compare(results, baseline, tolerance=TOLERANCE, min_seconds=MIN_SECONDS):
+    """Stages slower than in ``baseline``, a list of ``(scale, stage, seconds, baseline seconds)``."""
+    regressions = []
+    for scale, stages in results.items():
+        for stage, result in stages.items():
+            before = baseline.get(scale, {}).get(stage)
+            if before is None:
+                continue
+            if result['seconds'] > before['seconds'] * (1 + tolerance) and \
+                    result['seconds'] - before['seconds'] > min_seconds:
+                regressions.append((scale, stage, result['seconds'], before['seconds']))
+    return regressions
+
+
+def environment():
+    return {'date': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the pipeline stages.')
+    parser.add_argument('--scales', type=int, nargs='+', default=list(SCALES),
+                        help='panel sizes (default: {})'.format(' '.join(map(str, SCALES))))
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per scale, the best one is kept')
+    parser.add_argument('--out', default='bench.json', help='results file (default: bench.json)')
+    parser.add_argument('--baseline', help='baseline file to compare with')
+    parser.add_argument('--save-baseline', metavar='PATH', help='also save the results as a baseline')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE,
+                        help='allowed slowdown against the baseline (default: 0.25)')
+    args = parser.parse_args(argv)
+
+    results = {}
+    for scale in args.scales:
+        results[str(scale)] = bench_scale(scale, args.repeat)
+        for stage in STAGES:
+            result = results[str(scale)][stage]
+            print('{:>5}x {:<10} {:>10.4f} s {:>10.1f} MB peak {:>10.1f} MB out {:>10} rows'.format(
+                scale, stage, result['seconds'], result['peak_mb'], result['out_mb'], result['rows']))
+
+    report = {'environment': environment(), 'results': results}
+    for path in filter(None, [args.out, args.save_baseline]):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.tolerance)
+        for scale, stage, seconds, before in regressions:
+            print('REGRESSION {}x {}: {:.4f} s (baseline {:.4f} s)'.format(scale, stage, seconds, before))
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
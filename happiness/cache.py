@@ -0,0 +1,156 @@
+"""Columnar on-disk cache of the normalized yearly data frames and of ``ranking``.
+
+Every yearly data frame is stored under a key made from the content of its csv
+file, its schema entry and the country index. ``ranking`` is
+stored under a key made from the keys of its years. A changed csv or schema
+gives a new key: the older files of the year are deleted when the new one is
+written, and only the ``RANKING_FILES`` most recently used ``ranking`` files
+are kept.
+
+The files are written as uncompressed Feather (Arrow IPC) and memory-mapped
+when read. Without pyarrow the cache falls back to pickle files.
+"""
+
+import hashlib
+import os
+
+import pandas as pd
+
+from .countries import COUNTRIES_CSV
+from .loader import DATA_DIR, load_year
+from .panel import build_ranking
+from .parallel import pmap
+from .profiling import profiled
+from .schema import YEARS
+
+try:
+    import pyarrow.feather as feather
+except ImportError:
+    feather = None
+
+#bump when the way the data is prepared changes, so old cache files are not used
+CACHE_VERSION = 3
+
+CACHE_DIR = os.path.join(DATA_DIR, '.cache')
+
+#number of ranking files kept (one per set of years and versions of their files)
+RANKING_FILES = 4
+
+_hashes = {}
+
+
+def file_hash(path):
+    """sha256 of the content of a file (computed once per file version)."""
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    if key not in _hashes:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        _hashes[key] = digest.hexdigest()
+    return _hashes[key]
+
+
+def _schema_repr(schema):
+    return repr((schema.year, schema.filename, sorted(schema.columns.items()),
+                 schema.region, schema.rank))
+
+
+def year_key(year, data_dir=DATA_DIR):
+    """Cache key of one normalized year."""
+    schema = YEARS[year]
+    parts = [str(CACHE_VERSION), _schema_repr(schema), file_hash(os.path.join(data_dir, schema.filename)),
+             file_hash(COUNTRIES_CSV)]
+    return hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()[:16]
+
+
+def ranking_key(keys):
+    """Cache key of ``ranking`` built from the years with the given keys (in year order)."""
+    return hashlib.sha256('\n'.join(keys).encode('utf-8')).hexdigest()[:16]
+
+
+def _path(cache_dir, name):
+    return os.path.join(cache_dir, name + ('.feather' if feather is not None else '.pkl'))
+
+
+@profiled('cache_read')
+def read_frame(path):
+    """Read a cached data frame, None if it is not in the cache."""
+    if not os.path.exists(path):
+        return None
+    if feather is not None:
+        return feather.read_table(path, memory_map=True).to_pandas()
+    return pd.read_pickle(path)
+
+
+@profiled('cache_write')
+def write_frame(data, path):
+    """Write a data frame to the cache (written to a temporary file first)."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = '{}.{}.tmp'.format(path, os.getpid())
+    if feather is not None:
+        feather.write_feather(data.reset_index(drop=True), tmp, compression='uncompressed')
+    else:
+        data.to_pickle(tmp)
+    os.replace(tmp, path)
+
+
+def remove_stale(cache_dir, prefix, keep=(), max_files=0):
+    """Delete the cache files named ``prefix*`` except ``keep`` and the ``max_files`` most recently used."""
+    try:
+        entries = [entry for entry in os.scandir(cache_dir)
+                   if entry.name.startswith(prefix) and not entry.name.endswith('.tmp')]
+    except OSError:
+        return
+    files = sorted(((entry.stat().st_mtime_ns, entry.path) for entry in entries if entry.path not in keep),
+                   reverse=True)
+    for _, path in files[max_files:]:
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+
+
+def load_year_cached(year, data_dir=DATA_DIR, cache_dir=CACHE_DIR, key=None):
+    """Normalized data frame of one year, read from the cache or built and cached."""
+    if key is None:
+        key = year_key(year, data_dir)
+    path = _path(cache_dir, 'year-{}-{}'.format(year, key))
+    data = read_frame(path)
+    if data is None:
+        data = load_year(year, data_dir)
+        write_frame(data, path)
+        remove_stale(cache_dir, 'year-{}-'.format(year), keep=[path])
+    return data
+
+
+def _cached_task(task):
+    schema, data_dir, cache_dir, key = task
+    YEARS.setdefault(schema.year, schema)
+    return load_year_cached(schema.year, data_dir, cache_dir, key)
+
+
+@profiled('load_panel')
+def load_panel(years=None, data_dir=DATA_DIR, cache_dir=CACHE_DIR, jobs=1, executor='process'):
+    """Yearly data frames and ``ranking``, using the cache when nothing has changed.
+
+    Returns ``(frames, ranking)`` where ``frames`` is a dict ``{year: data frame}``.
+    ``jobs`` and ``executor`` run the preparation of the years in parallel
+    (see ``happiness.parallel.pmap``), ``jobs=1`` - serially.
+    """
+    if years is None:
+        years = sorted(YEARS)
+    keys = [year_key(year, data_dir) for year in years]
+    tasks = [(YEARS[year], data_dir, cache_dir, key) for year, key in zip(years, keys)]
+    frames = dict(zip(years, pmap(_cached_task, tasks, jobs, executor)))
+
+    path = _path(cache_dir, 'ranking-' + ranking_key(keys))
+    ranking = read_frame(path)
+    if ranking is None:
+        ranking = build_ranking(frames.values())
+        write_frame(ranking, path)
+        remove_stale(cache_dir, 'ranking-', keep=[path], max_files=RANKING_FILES - 1)
+    else:
+        os.utime(path)
+    return frames, ranking
@@ -0,0 +1,261 @@
+"""Happiness profiles: k-means clusters of the countries in every year.
+
+The countries of every year are clustered over the normalized indicators
+with k-means, all the years in one batched run: the distances of every
+country-year to the centroids of its year and the new centroids of all the
+years are computed together, a year stops being updated once its centroids
+stop moving. ``fit`` runs two such passes: every year from the clusters of
+all the country-years together, then every year again from the centroids the
+previous year reached in the first pass, so a cluster keeps its number from
+year to year. A year added later with ``refresh`` is started from the final
+centroids of the previous year (``iterations`` reports both passes)::
+
+    profiles = Profiles(ranking, k=4)
+    profiles.labels()         # cluster of every country and year
+    profiles.transitions()    # countries moving between clusters
+    profiles.flows()          # number of countries from cluster to cluster (for a Sankey chart)
+
+Missing indicators are replaced with the mean of the indicator in the year.
+"""
+
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from .panel import content_hash
+from .profiling import profiled
+from .similarity import FEATURES
+
+MAX_ITER = 100
+
+#largest move of a centroid at which a year has converged
+TOLERANCE = 1e-6
+
+
+def _filled(data, features):
+    values = data[features].to_numpy(dtype='float64')
+    if np.isnan(values).any():
+        values = np.where(np.isnan(values), np.nanmean(values, axis=0), values)
+    return np.nan_to_num(values)
+
+
+def _plus_plus(values, k, rng):
+    """k-means++ initial centroids."""
+    centroids = [values[rng.integers(len(values))]]
+    squared = ((values - centroids[0]) ** 2).sum(axis=1)
+    for _ in range(1, k):
+        total = squared.sum()
+        choice = rng.choice(len(values), p=squared / total) if total > 0 else rng.integers(len(values))
+        centroids.append(values[choice])
+        squared = np.minimum(squared, ((values - values[choice]) ** 2).sum(axis=1))
+    return np.array(centroids)
+
+
+def _assign(values, codes, centroids):
+    """Nearest centroid of every point among the centroids of its group and the squared distance."""
+    squared = ((values[:, None, :] - centroids[codes]) ** 2).sum(axis=2)
+    labels = squared.argmin(axis=1)
+    return labels, squared[np.arange(len(values)), labels]
+
+
+@profiled('kmeans')
+def kmeans(values, codes, centroids, max_iter=MAX_ITER, tol=TOLERANCE):
+    """Batched Lloyd iterations, every group (``codes``) with its own centroids.
+
+    ``centroids`` has the shape (groups, k, features) and holds the starting
+    centroids. Returns ``(centroids, labels, distances, iterations)`` with the
+    number of iterations of every group. An empty cluster keeps its centroid.
+    """
+    centroids = np.array(centroids, dtype='float64')
+    groups, k, width = centroids.shape
+    iterations = np.zeros(groups, dtype='int64')
+    active = np.ones(groups, dtype=bool)
+    for _ in range(max_iter):
+        labels, _ = _assign(values, codes, centroids)
+        cells = codes * k + labels
+        counts = np.bincount(cells, minlength=groups * k).reshape(groups, k)
+        sums = np.stack([np.bincount(cells, values[:, j], minlength=groups * k) for j in range(width)], axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            updated = np.where(counts[:, :, None] > 0, sums.reshape(groups, k, width) / counts[:, :, None], centroids)
+        moved = np.sqrt(((updated - centroids) ** 2).sum(axis=2)).max(axis=1)
+        centroids[active] = updated[active]
+        iterations[active] += 1
+        active &= moved > tol
+        if not active.any():
+            break
+    labels, distances = _assign(values, codes, centroids)
+    return centroids, labels, np.sqrt(distances), iterations
+
+
+def _matching(cost):
+    """Permutation ``p`` minimizing ``cost[i, p[i]]`` (scipy when available, imported only here)."""
+    try:
+        from scipy.optimize import linear_sum_assignment
+    except ImportError:
+        pass
+    else:
+        return linear_sum_assignment(cost)[1]
+    if len(cost) <= 8:
+        return np.array(min(itertools.permutations(range(len(cost))),
+                            key=lambda p: cost[np.arange(len(cost)), list(p)].sum()))
+    order = np.full(len(cost), -1)
+    for flat in np.argsort(cost, axis=None):
+        i, j = divmod(flat, len(cost))
+        if order[i] < 0 and j not in order:
+            order[i] = j
+    return order
+
+
+class Profiles(object):
+    """k-means clusters of the countries of every year of ``ranking``."""
+
+    def __init__(self, ranking, k=4, features=FEATURES, seed=0, max_iter=MAX_ITER):
+        self.k = k
+        self.features = list(features)
+        self._hashed = ['Country'] + self.features
+        self.seed = seed
+        self.max_iter = max_iter
+        self._years = {}
+        self._cache = {}
+        self.fit(ranking)
+
+    @property
+    def years(self):
+        return sorted(self._years)
+
+    def _split(self, ranking):
+        return {int(year): data.reset_index(drop=True)
+                for year, data in ranking.groupby('Year', sort=True, observed=True)}
+
+    def fit(self, ranking):
+        """Cluster all the years of ``ranking``."""
+        years = self._split(ranking)
+        self._years = {}
+        self._cache = {}
+        if not years:
+            return
+        values = {year: _filled(data, self.features) for year, data in years.items()}
+        order = sorted(years)
+        stacked = np.concatenate([values[year] for year in order])
+        codes = np.repeat(np.arange(len(order)), [len(values[year]) for year in order])
+
+        #the start of the first year: the clusters of all the country-years together
+        rng = np.random.default_rng(self.seed)
+        pooled = _plus_plus(stacked, self.k, rng)
+        pooled = kmeans(stacked, np.zeros(len(stacked), dtype='intp'), pooled[None], self.max_iter)[0][0]
+
+        #the years are clustered from the common start first, then every year again from the
+        #centroids of the previous year, both times all the years in one batched run
+        start = np.repeat(pooled[None], len(order), axis=0)
+        converged, _, _, first = kmeans(stacked, codes, start, self.max_iter)
+        start = np.concatenate([pooled[None], converged[:-1]])
+        centroids, labels, distances, second = kmeans(stacked, codes, start, self.max_iter)
+
+        offsets = np.r_[0, np.cumsum([len(values[year]) for year in order])]
+        for i, year in enumerate(order):
+            rows = slice(offsets[i], offsets[i + 1])
+            self._years[year] = dict(data=years[year], key=content_hash(years[year], self._hashed),
+                                     centroids=centroids[i], labels=labels[rows], distances=distances[rows],
+                                     iterations=(int(first[i]), int(second[i])))
+        self._align(order[1:])
+
+    def refresh(self, ranking):
+        """Take the data of ``ranking``, clustering again only the new years and the changed ones.
+
+        Every such year starts from the centroids of the previous year. Returns the list of those years.
+        """
+        years = self._split(ranking)
+        if not self._years:
+            self.fit(ranking)
+            return sorted(years)
+        removed = set(self._years) - set(years)
+        for year in removed:
+            del self._years[year]
+        changed = [year for year, data in sorted(years.items())
+                   if year not in self._years or self._years[year]['key'] != content_hash(data, self._hashed)]
+        for year in changed:
+            earlier = [y for y in self._years if y < year]
+            start = self._years[max(earlier) if earlier else min(self._years)]['centroids']
+            values = _filled(years[year], self.features)
+            centroids, labels, distances, iterations = kmeans(values, np.zeros(len(values), dtype='intp'),
+                                                              start[None], self.max_iter)
+            self._years[year] = dict(data=years[year], key=content_hash(years[year], self._hashed),
+                                     centroids=centroids[0], labels=labels, distances=distances,
+                                     iterations=(0, int(iterations[0])))
+            self._align([year])
+        if changed or removed:
+            self._cache = {}
+        return changed
+
+    def _align(self, years):
+        """Renumber the clusters of ``years`` after the closest clusters of the previous year."""
+        for year in years:
+            earlier = [y for y in self._years if y < year]
+            if not earlier:
+                continue
+            entry, previous = self._years[year], self._years[max(earlier)]['centroids']
+            cost = ((previous[:, None, :] - entry['centroids'][None, :, :]) ** 2).sum(axis=2)
+            order = _matching(cost)
+            if (order != np.arange(self.k)).any():
+                entry['centroids'] = entry['centroids'][order]
+                entry['labels'] = np.argsort(order)[entry['labels']]
+
+    def _cached(self, key, compute):
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def labels(self):
+        """Cluster of every country and year: Region, Country, ISO3, Year, Cluster and Distance to the centroid."""
+        return self._cached('labels', self._labels)
+
+    def _labels(self):
+        frames = []
+        for year in self.years:
+            entry = self._years[year]
+            frame = entry['data'][['Region', 'Country', 'ISO3', 'Year']].copy()
+            frame['Cluster'] = entry['labels']
+            frame['Distance'] = entry['distances']
+            frames.append(frame)
+        if not frames:
+            return pd.DataFrame(columns=['Region', 'Country', 'ISO3', 'Year', 'Cluster', 'Distance'])
+        return pd.concat(frames, ignore_index=True)
+
+    def centroids(self):
+        """Centroids of the clusters, indexed by Year and Cluster, one column per indicator."""
+        return self._cached('centroids', lambda: pd.DataFrame(
+            np.concatenate([self._years[year]['centroids'] for year in self.years]),
+            index=pd.MultiIndex.from_product([self.years, range(self.k)], names=['Year', 'Cluster']),
+            columns=self.features))
+
+    def iterations(self):
+        """Number of k-means iterations of every year, indexed by year: ``From pooled`` (the first
+        pass of ``fit``, 0 for the years added by ``refresh``), ``From previous year`` and ``Total``."""
+        iterations = pd.DataFrame.from_dict({year: self._years[year]['iterations'] for year in self.years},
+                                            orient='index', columns=['From pooled', 'From previous year'])
+        iterations['Total'] = iterations.sum(axis=1)
+        return iterations.rename_axis('Year')
+
+    def transitions(self):
+        """One row per country and pair of its consecutive reports: Country, ISO3, Region,
+        From Year, To Year, From Cluster, To Cluster and Moved."""
+        return self._cached('transitions', self._transitions)
+
+    def _transitions(self):
+        labels = self.labels().sort_values(['Country', 'Year'], kind='stable')
+        grouped = labels.groupby('Country', observed=True, sort=False)
+        transitions = pd.DataFrame({'Country': labels['Country'], 'ISO3': labels['ISO3'], 'Region': labels['Region'],
+                                    'From Year': grouped['Year'].shift(), 'To Year': labels['Year'],
+                                    'From Cluster': grouped['Cluster'].shift(), 'To Cluster': labels['Cluster']})
+        transitions = transitions.dropna(subset=['From Year']).reset_index(drop=True)
+        transitions = transitions.astype({'From Year': labels['Year'].dtype, 'From Cluster': 'int64'})
+        transitions['Moved'] = transitions['From Cluster'] != transitions['To Cluster']
+        return transitions
+
+    def flows(self):
+        """Number of countries going from every cluster to every cluster between consecutive reports:
+        From Year, To Year, From Cluster, To Cluster and Countries."""
+        return self._cached('flows', lambda: self.transitions()
+                            .groupby(['From Year', 'To Year', 'From Cluster', 'To Cluster'], sort=True)
+                            .size().rename('Countries').reset_index())
@@ -0,0 +1,150 @@
+"""Correlation matrices of the indicators.
+
+The numeric block of ``ranking`` is taken out once as a float array and the
+matrices are cached, so showing the same matrix again (the table and the
+heatmap of the report) costs nothing. Matrices per year or per region are
+computed for all the groups in one batched pass.
+
+Missing values are handled pairwise, the same as ``DataFrame.corr``. For
+``spearman`` the values are ranked once per column within every group; only
+the pairs of columns with missing values in a group are ranked again on
+their complete rows. ``kendall`` is computed by pandas group by group and
+needs scipy.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .profiling import profiled
+from .schema import INDICATORS
+
+#columns correlated by default
+CORR_COLUMNS = ['Happiness Rank'] + INDICATORS
+
+METHODS = ('pearson', 'spearman', 'kendall')
+
+
+def _pearson(values, codes):
+    """Pearson correlation matrices of every group, array of shape (groups, columns, columns).
+
+    The sums of all the groups are taken with ``reduceat`` over the rows ordered
+    by group, with pairwise complete observations.
+    """
+    order = np.argsort(codes, kind='stable')
+    x = values[order]
+    starts = np.flatnonzero(np.r_[True, np.diff(codes[order]) != 0])
+    sizes = np.diff(np.r_[starts, len(x)])
+
+    valid = ~np.isnan(x)
+    mask = valid.astype('float64')
+    #centering on the group means does not change the result but keeps the sums small
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.add.reduceat(np.where(valid, x, 0.0), starts, axis=0) / np.add.reduceat(mask, starts, axis=0)
+    x = np.where(valid, x - np.repeat(np.nan_to_num(mean), sizes, axis=0), 0.0)
+
+    n = np.add.reduceat(np.einsum('ri,rj->rij', mask, mask), starts, axis=0)
+    sx = np.add.reduceat(np.einsum('ri,rj->rij', x, mask), starts, axis=0)
+    sxx = np.add.reduceat(np.einsum('ri,rj->rij', x * x, mask), starts, axis=0)
+    sxy = np.add.reduceat(np.einsum('ri,rj->rij', x, x), starts, axis=0)
+    sy = sx.transpose(0, 2, 1)
+    syy = sxx.transpose(0, 2, 1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = sxy - sx * sy / n
+        var = (sxx - sx * sx / n) * (syy - sy * sy / n)
+        corr = np.clip(cov / np.sqrt(var), -1.0, 1.0)
+        corr[var <= 0] = np.nan
+    diagonal = np.arange(corr.shape[1])
+    corr[:, diagonal, diagonal] = np.where(np.isnan(corr[:, diagonal, diagonal]), np.nan, 1.0)
+    return corr
+
+
+def _rerank_missing(matrices, values, codes):
+    """Spearman correlations of the pairs of columns with missing values, ranked on their complete rows.
+
+    ``matrices`` are the correlations of the ranks taken over whole columns, in the order of ``np.unique(codes)``.
+    """
+    for g, code in enumerate(np.unique(codes)):
+        group = values[codes == code]
+        missing = np.flatnonzero(np.isnan(group).any(axis=0))
+        for i in missing:
+            for j in range(group.shape[1]):
+                if i == j:
+                    continue
+                rows = ~np.isnan(group[:, i]) & ~np.isnan(group[:, j])
+                pair = pd.DataFrame(group[rows][:, [i, j]]).rank().to_numpy()
+                if rows.sum() < 2 or pair[:, 0].std() == 0 or pair[:, 1].std() == 0:
+                    value = np.nan
+                else:
+                    value = np.corrcoef(pair[:, 0], pair[:, 1])[0, 1]
+                matrices[g, i, j] = matrices[g, j, i] = value
+
+
+class Correlations(object):
+    """Cached correlation matrices of the indicators of ``ranking``.
+
+    With ``cache=False`` nothing is kept (for callers with their own bounded cache).
+    """
+
+    def __init__(self, ranking, columns=CORR_COLUMNS, cache=True):
+        self.columns = list(columns)
+        self.values = ranking[self.columns].to_numpy(dtype='float64')
+        self.years = ranking['Year'].to_numpy()
+        self.groups = {'Year': ranking['Year'], 'Region': ranking['Region']}
+        self._cache = {} if cache else None
+
+    def _rows(self, years):
+        if years is None:
+            return slice(None)
+        return np.isin(self.years, list(years))
+
+    def _columns(self, indicators):
+        if indicators is None:
+            return self.columns
+        return [column for column in self.columns if column in set(indicators)]
+
+    def matrix(self, years=None, indicators=None, method='pearson'):
+        """Correlation matrix of the whole panel (or of the given years), all NaN when no row is selected."""
+        matrices = self.by(None, years, indicators, method)
+        if None not in matrices:
+            columns = self._columns(indicators)
+            return pd.DataFrame(np.nan, index=columns, columns=columns)
+        return matrices[None]
+
+    def by(self, group='Year', years=None, indicators=None, method='pearson'):
+        """Correlation matrices per ``group`` (``Year`` or ``Region``), ``{group value: data frame}``."""
+        if method not in METHODS:
+            raise ValueError('unknown method {!r}, expected one of {}'.format(method, ', '.join(METHODS)))
+        columns = self._columns(indicators)
+        key = (group, None if years is None else tuple(sorted(years)), tuple(columns), method)
+        if self._cache is None:
+            return self._compute(group, years, columns, method)
+        if key not in self._cache:
+            self._cache[key] = self._compute(group, years, columns, method)
+        return self._cache[key]
+
+    @profiled('correlation')
+    def _compute(self, group, years, columns, method):
+        rows = self._rows(years)
+        values = self.values[rows][:, [self.columns.index(column) for column in columns]]
+        if group is None:
+            codes, labels = np.zeros(len(values), dtype='intp'), [None]
+        else:
+            codes, labels = pd.factorize(self.groups[group][rows], sort=True)
+            labels = list(labels)
+        if len(values) == 0:
+            return {}
+
+        if method == 'kendall':
+            frame = pd.DataFrame(values, columns=columns)
+            return {labels[code]: data.corr(method='kendall') for code, data in frame.groupby(codes)}
+
+        if method == 'spearman':
+            ranks = pd.DataFrame(values).groupby(codes).rank().to_numpy()
+            matrices = _pearson(ranks, codes)
+            _rerank_missing(matrices, values, codes)
+        else:
+            matrices = _pearson(values, codes)
+        present = np.unique(codes)
+        return {labels[code]: pd.DataFrame(matrix, index=columns, columns=columns)
+                for code, matrix in zip(present, matrices)}
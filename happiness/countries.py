@@ -0,0 +1,98 @@
+"""Country index: canonical names, spelling variants, regions and ISO-3 codes.
+
+The report changes the spelling of some countries between the years
+("Taiwan" / "Taiwan Province of China", "Trinidad and Tobago" /
+"Trinidad & Tobago", ...). All the names are resolved through one index read
+from ``countries.csv`` instead of joining on the exact country name, so no
+country is lost when its spelling changes. Codes starting with ``X`` are used
+for the territories without an ISO-3 code (Kosovo, North Cyprus, Somaliland).
+"""
+
+import os
+import re
+import warnings
+
+import pandas as pd
+
+from .profiling import profiled
+
+COUNTRIES_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'countries.csv')
+
+
+def name_key(name):
+    """Spelling-insensitive form of a country name used for the lookups."""
+    key = name.casefold().replace('&', ' and ')
+    return re.sub(r'[\s.,]+', ' ', key).strip()
+
+
+class UnmatchedCountryWarning(UserWarning):
+    """Raised (as a warning) for the country names missing from the index."""
+
+
+class CountryIndex(object):
+    """Lookup of country names to ISO-3 codes, canonical names and regions."""
+
+    def __init__(self, records):
+        self.names = {}
+        self.regions = {}
+        self._codes = {}
+        for code, name, region, aliases in records:
+            self.names[code] = name
+            self.regions[code] = region
+            for alias in [name, code] + list(aliases):
+                self._codes[name_key(alias)] = code
+
+    @classmethod
+    def from_csv(cls, path=COUNTRIES_CSV):
+        data = pd.read_csv(path, dtype=str, keep_default_na=False)
+        aliases = [value.split('|') if value else [] for value in data['Aliases']]
+        return cls(zip(data['ISO3'], data['Country'], data['Region'], aliases))
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name_key(name) in self._codes
+
+    def code(self, name):
+        """ISO-3 code of a country name, None if the name is not in the index."""
+        return self._codes.get(name_key(name))
+
+    def resolve(self, countries, warn=True):
+        """ISO-3 codes of a Series of country names (NaN for the unknown names).
+
+        Every distinct name is looked up once. The unknown names are reported
+        with an ``UnmatchedCountryWarning``.
+        """
+        names = pd.Series(countries.unique())
+        codes = dict(zip(names, names.map(lambda name: self._codes.get(name_key(name)))))
+        unmatched = sorted(str(name) for name, code in codes.items() if pd.isna(code))
+        if unmatched and warn:
+            warnings.warn('countries missing from the country index: ' + ', '.join(unmatched),
+                          UnmatchedCountryWarning, stacklevel=2)
+        return countries.map(codes)
+
+    @profiled('resolve_countries')
+    def attach(self, data, region=False):
+        """Add ``ISO3`` to ``data`` and replace ``Country`` with the canonical names.
+
+        With ``region=True`` the ``Region`` column is taken from the index as well.
+        Rows of unknown countries keep their name (and get no region from the index).
+        """
+        codes = self.resolve(data['Country'], warn=True)
+        data['ISO3'] = codes
+        data['Country'] = codes.map(self.names).fillna(data['Country'])
+        if region:
+            data['Region'] = codes.map(self.regions)
+        return data
+
+
+_index = None
+
+
+def country_index():
+    """The country index read from ``countries.csv`` (read once)."""
+    global _index
+    if _index is None:
+        _index = CountryIndex.from_csv()
+    return _index
@@ -0,0 +1,179 @@
+"""Compact export of several figures into one html file.
+
+Every ``plotly.offline.iplot`` / ``write_html`` call carries its own copy of
+the figure (and usually of plotly.js). The export here writes all the figures
+of the report into one page which:
+
+- loads plotly.js once (inline, from the CDN or from a local file),
+- stores the numeric arrays as base64 typed arrays (``{"dtype", "bdata"}``,
+  understood by plotly.js >= 2.28),
+- stores the arrays of strings (countries, regions, ...) and the layout
+  templates that repeat between the figures only once, the figures refer to
+  them by key and the references are resolved in the browser before plotting.
+"""
+
+import base64
+import hashlib
+import html
+import json
+import os
+
+import numpy as np
+
+from . import backends
+from .profiling import profiled
+
+#numeric dtypes of the plotly.js typed arrays
+TYPED_ARRAYS = {'float64': 'f8', 'float32': 'f4', 'int32': 'i4', 'uint32': 'u4', 'int16': 'i2',
+                'uint16': 'u2', 'int8': 'i1', 'uint8': 'u1'}
+
+#arrays shorter than this are left as they are
+MIN_LENGTH = 8
+
+_PAGE = '''<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+{plotlyjs}
+</head>
+<body>
+{divs}
+<script type="text/javascript">
+var SHARED = {shared};
+var FIGURES = {figures};
+function resolve(value) {{
+    if (Array.isArray(value)) return value.map(resolve);
+    if (value !== null && typeof value === 'object') {{
+        if (value.$ref !== undefined) return resolve(SHARED[value.$ref]);
+        var out = {{}};
+        for (var key in value) out[key] = resolve(value[key]);
+        return out;
+    }}
+    return value;
+}}
+FIGURES.forEach(function (figure) {{
+    var fig = resolve(figure.figure);
+    Plotly.newPlot(figure.id, {{data: fig.data, layout: fig.layout || {{}}, frames: fig.frames || [],
+                               config: {{responsive: true}}}});
+}});
+</script>
+</body>
+</html>
+'''
+
+
+def typed_array(values):
+    """Numeric array as a plotly.js typed array, None when it has no typed array dtype."""
+    values = np.asarray(values)
+    if values.dtype.kind == 'i' and values.dtype.itemsize == 8:
+        if values.size and (values.min() < -2 ** 31 or values.max() >= 2 ** 31):
+            values = values.astype('float64')
+        else:
+            values = values.astype('int32')
+    elif values.dtype.kind == 'b':
+        values = values.astype('uint8')
+    code = TYPED_ARRAYS.get(values.dtype.name)
+    if code is None:
+        return None
+    encoded = {'dtype': code, 'bdata': base64.b64encode(np.ascontiguousarray(values).tobytes()).decode('ascii')}
+    if values.ndim > 1:
+        encoded['shape'] = ','.join(str(n) for n in values.shape)
+    return encoded
+
+
+class SharedPool(object):
+    """Values shared by the figures, stored once under a key made from their content."""
+
+    def __init__(self):
+        self.values = {}
+
+    def ref(self, value):
+        text = json.dumps(value, sort_keys=True, separators=(',', ':'))
+        key = hashlib.sha1(text.encode('utf-8')).hexdigest()[:12]
+        self.values.setdefault(key, value)
+        return {'$ref': key}
+
+
+def _is_numeric_list(value):
+    return all(isinstance(item, (int, float)) and not isinstance(item, bool) for item in value)
+
+
+def encode(value, pool, key=None):
+    """JSON-ready copy of a figure part with typed arrays and shared values."""
+    if isinstance(value, np.ndarray):
+        if value.dtype.kind in 'iufb':
+            encoded = typed_array(value)
+            if encoded is not None:
+                return encoded
+        value = value.tolist()
+    elif isinstance(value, np.generic):
+        return value.item()
+
+    if isinstance(value, dict):
+        if 'bdata' in value:
+            return value
+        encoded = {name: encode(item, pool, name) for name, item in value.items()}
+        return pool.ref(encoded) if key == 'template' else encoded
+    if isinstance(value, (list, tuple)):
+        value = [encode(item, pool) for item in value]
+        if len(value) >= MIN_LENGTH:
+            if _is_numeric_list(value):
+                return typed_array(np.asarray(value))
+            if all(isinstance(item, str) for item in value):
+                return pool.ref(value)
+        return value
+    return value
+
+
+def write_plotlyjs(directory):
+    """Write ``plotly.min.js`` to ``directory`` (once), returns its path."""
+    path = os.path.join(directory, 'plotly.min.js')
+    if not os.path.exists(path):
+        os.makedirs(directory, exist_ok=True)
+        tmp = '{}.{}.tmp'.format(path, os.getpid())
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(backends.plotly_offline().get_plotlyjs())
+        os.replace(tmp, path)
+    return path
+
+
+def _plotlyjs(include, directory):
+    offline = backends.plotly_offline()
+    if include is True or include == 'inline':
+        return '<script type="text/javascript">{}</script>'.format(offline.get_plotlyjs())
+    if include == 'cdn':
+        return '<script src="https://cdn.plot.ly/plotly-{}.min.js"></script>'.format(offline.get_plotlyjs_version())
+    if include == 'directory':
+        include = os.path.basename(write_plotlyjs(directory))
+    return '<script src="{}"></script>'.format(html.escape(include))
+
+
+@profiled('compact_html')
+def compact_html(figures, path, include_plotlyjs='directory', title='World Happiness Report 2015-2020'):
+    """Write ``figures`` (``{name: figure dict}``) into one compact html page.
+
+    ``include_plotlyjs`` is ``True``/``'inline'`` (embedded once), ``'cdn'``,
+    ``'directory'`` (``plotly.min.js`` written next to the page) or the path
+    of a local plotly.js file. Returns ``path``.
+    """
+    go = backends.graph_objs()
+    pool = SharedPool()
+    entries = []
+    divs = []
+    for i, (name, figure) in enumerate(figures.items()):
+        div = 'figure-{}'.format(i)
+        fig = go.Figure(figure).to_plotly_json()
+        entries.append({'id': div, 'figure': encode(fig, pool)})
+        divs.append('<div id="{}" title="{}"></div>'.format(div, html.escape(str(name))))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    page = _PAGE.format(title=html.escape(title),
+                        plotlyjs=_plotlyjs(include_plotlyjs, directory),
+                        divs='\n'.join(divs),
+                        shared=json.dumps(pool.values, separators=(',', ':')),
+                        figures=json.dumps(entries, separators=(',', ':')))
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(page)
+    return path
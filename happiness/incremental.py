@@ -0,0 +1,71 @@
+"""Incremental ingest of a new report year.
+
+Every year is normalized on its own, so a new year does not change the data of
+the earlier years. ``append_year`` prepares only the new file and appends it to
+the cached ``ranking``. The per-year artefacts of the figures (map partition,
+top 10 rows, correlation matrices, see ``happiness.artefacts``) are built and
+cached only for that year, the report reads the other years from the cache.
+
+Adding the 2021 report::
+
+    # 1. add a YearSchema entry for 2021 to happiness/schema.py
+    # 2. put 2021.csv next to the other files
+    python -m happiness.incremental 2021
+"""
+
+import argparse
+
+from .artefacts import YearArtefacts
+from .cache import (CACHE_DIR, RANKING_FILES, _path, load_panel, load_year_cached, ranking_key, read_frame,
+                    remove_stale, write_frame, year_key)
+from .loader import DATA_DIR
+from .panel import build_ranking
+from .schema import YEARS, register
+
+
+def append_year(year, schema=None, data_dir=DATA_DIR, cache_dir=CACHE_DIR):
+    """Add (or refresh) one year in the cached ``ranking`` without preparing the other years again.
+
+    ``schema`` registers the year first when it is not in the registry yet.
+    The artefacts of the year are written to ``cache_dir`` as well.
+    Returns ``(data, ranking)`` - the normalized data frame of the year and the new ``ranking``.
+    """
+    if schema is not None:
+        register(schema)
+    if year not in YEARS:
+        raise KeyError('year {} is not in the schema registry'.format(year))
+
+    years = sorted(YEARS)
+    keys = {y: year_key(y, data_dir) for y in years}
+    data = load_year_cached(year, data_dir, cache_dir, keys[year])
+
+    path = _path(cache_dir, 'ranking-' + ranking_key([keys[y] for y in years]))
+    ranking = read_frame(path)
+    if ranking is None:
+        #the ranking of the earlier years, built in full only when it is not cached either
+        earlier = [y for y in years if y != year]
+        base = read_frame(_path(cache_dir, 'ranking-' + ranking_key([keys[y] for y in earlier])))
+        if base is None:
+            base = load_panel(earlier, data_dir, cache_dir)[1]
+
+        ranking = build_ranking([base, data]).sort_values('Year', kind='stable').reset_index(drop=True)
+        write_frame(ranking, path)
+        remove_stale(cache_dir, 'ranking-', keep=[path], max_files=RANKING_FILES - 1)
+    YearArtefacts(directory=cache_dir).refresh(ranking, years=[year])
+    return data, ranking
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Add a new report year to the cached ranking.')
+    parser.add_argument('year', type=int, help='year registered in happiness/schema.py')
+    parser.add_argument('--data-dir', default=DATA_DIR, help='folder with the csv files')
+    parser.add_argument('--cache-dir', default=CACHE_DIR, help='cache folder')
+    args = parser.parse_args(argv)
+
+    data, ranking = append_year(args.year, data_dir=args.data_dir, cache_dir=args.cache_dir)
+    print('{}: {} countries, ranking: {} rows, years {}'.format(
+        args.year, len(data.index), len(ranking.index), sorted(int(y) for y in ranking['Year'].unique())))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Loading of the yearly csv files into the unified column format."""
+
+import os
+
+import pandas as pd
+
+from .countries import country_index
+from .normalize import normalize_panel
+from .panel import compact
+from .parallel import pmap
+from .profiling import profiled
+from .schema import COLUMNS, YEARS
+
+#folder with the csv files (the root of the project)
+DATA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@profiled('read_csv')
+def read_year(year, data_dir=DATA_DIR):
+    """Read the csv file of one year, only the needed columns, renamed to the unified names."""
+    schema = YEARS[year]
+    data = pd.read_csv(os.path.join(data_dir, schema.filename),
+                       usecols=schema.usecols(), dtype=schema.dtypes())
+
+    columns = dict(schema.columns)
+    if schema.region is not None:
+        columns[schema.region] = 'Region'
+    if schema.rank is not None:
+        columns[schema.rank] = 'Happiness Rank'
+    data = data.rename(columns=columns)
+
+    #recalculation of the rank based on the row order of the file
+    if schema.rank is None:
+        data['Happiness Rank'] = range(1, len(data.index) + 1)
+
+    data['Year'] = year
+    return data
+
+
+@profiled('load_year')
+def load_year(year, data_dir=DATA_DIR, scaler='minmax'):
+    """Load one year: read, rename, attach the region, normalize and store compactly (``panel.compact``).
+
+    ``scaler`` is one of ``happiness.normalize.SCALERS``, ``None`` leaves the values as they are.
+    """
+    schema = YEARS[year]
+    data = read_year(year, data_dir)
+
+    #the country names are resolved through the country index (ISO-3 code and canonical name),
+    #the files without a region take it from the index as well
+    data = country_index().attach(data, region=schema.region is None)
+
+    data = data[COLUMNS]
+    if scaler is not None:
+        data = normalize_panel(data, method=scaler, by=None)
+    return compact(data)
+
+
+def _load_task(task):
+    schema, data_dir, scaler = task
+    #the schema travels with the task, so the years registered at run time work in the workers too
+    YEARS.setdefault(schema.year, schema)
+    return load_year(schema.year, data_dir, scaler)
+
+
+def load_years(years=None, data_dir=DATA_DIR, scaler='minmax', jobs=1, executor='process'):
+    """Load all registered years (or the given ones) into a dict ``{year: data frame}``.
+
+    With ``jobs`` other than 1 the years are loaded by a pool of processes
+    (``executor='thread'`` - threads), ``jobs=None`` - one worker per core.
+    The result is the same as with the serial loading and in year order.
+    """
+    if years is None:
+        years = sorted(YEARS)
+    frames = pmap(_load_task, [(YEARS[year], data_dir, scaler) for year in years], jobs, executor)
+    return dict(zip(years, frames))
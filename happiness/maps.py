@@ -0,0 +1,163 @@
+"""Choropleth maps with a year slider.
+
+The data of every year (locations, regions and the indicator values) is
+prepared once with a single group-by over ``ranking`` and shared by all the
+maps, a map of a given indicator only picks its column from every year.
+"""
+
+import numpy as np
+
+from .profiling import profiled
+from .schema import INDICATORS
+
+#maps of the report: indicator, title, colorbar title, hover text
+MAPS = [
+    ('Happiness Rank', 'Life satisfaction ranking', 'Place in the ranking', 'full'),
+    ('Economy (GDP per Capita)', 'Economy (Gross Domestic Product per 1 inhabitant)', 'Indicator', 'region'),
+    ('Freedom', 'Freedom', 'Indicator', 'region'),
+    ('Trust (Government Corruption)', 'Trust (Government Corruption)', 'Indicator', 'region'),
+    ('Health (Life Expectancy)', 'Health (life expectancy)', 'Indicator', 'region'),
+]
+
+
+class YearPartition(object):
+    """Data of one year shared by all the maps.
+
+    The values stay numeric, the hover texts are formatted by plotly in the
+    browser (``customdata`` + ``hovertemplate``) instead of being built as strings here.
+    """
+
+    def __init__(self, year, data):
+        self.year = year
+        self.values = data[['Happiness Rank'] + INDICATORS].reset_index(drop=True)
+        self.locations = data['Country'].astype(str).to_numpy()
+        self.regions = data['Region'].astype(str).to_numpy()
+        self.customdata = self.values[INDICATORS].to_numpy()
+
+
+@profiled('map_partitions')
+def map_partitions(ranking):
+    """Split ``ranking`` into per-year partitions (one group-by), in year order."""
+    return [YearPartition(year, data) for year, data in ranking.groupby('Year', sort=True, observed=True)]
+
+
+def hovertemplate(indicator, hover='region'):
+    """Hover template of a map: country, value, region and (with ``hover='full'``) all the indicators."""
+    value = '%{z}' if indicator == 'Happiness Rank' else '%{z:.2f}'
+    lines = ['Country: %{location}', value, 'Region: %{text}']
+    if hover == 'full':
+        lines += ['{}: %{{customdata[{}]:.2f}}'.format(column, i) for i, column in enumerate(INDICATORS)]
+    return '<br>'.join(lines) + '<extra></extra>'
+
+
+@profiled('choropleth_figure')
+def choropleth_figure(partitions, indicator, title=None, colorbar='Indicator', hover='region'):
+    """Figure dict of a choropleth map of ``indicator`` with a year slider.
+
+    ``hover`` selects the hover text: ``region`` or ``full`` (region and all the indicators).
+    """
+    template = hovertemplate(indicator, hover)
+    data_slider = []
+    for partition in partitions:
+        data_by_year = dict(type='choropleth',
+                            colorscale='viridis',
+                            z=partition.values[indicator].to_numpy(),
+                            locations=partition.locations,
+                            locationmode='country names',
+                            text=partition.regions,
+                            hovertemplate=template,
+                            marker=dict(line=dict(color='lightgrey', width=0.5)),
+                            colorbar=_colorbar(colorbar))
+        if hover == 'full':
+            data_by_year['customdata'] = partition.customdata
+        data_slider.append(data_by_year)
+
+    #creating steps for a "slider" with years
+    steps = []
+    for i, partition in enumerate(partitions):
+        step = dict(method='restyle',
+                    args=['visible', [False] * len(data_slider)],
+                    label='Year {}'.format(partition.year))
+        step['args'][1][i] = True
+        steps.append(step)
+
+    sliders = [dict(active=0, pad={"t": 1}, steps=steps)]
+
+    return dict(data=data_slider, layout=_layout(indicator if title is None else title, sliders))
+
+
+@profiled('choropleth_animation')
+def choropleth_animation(partitions, indicator, title=None, colorbar='Indicator', hover='region'):
+    """Figure dict of a choropleth map of ``indicator`` with animation frames instead of one trace per year.
+
+    There is a single trace over the locations of all the years; every frame
+    only replaces its ``z`` and hover arrays (NaN for the countries missing in
+    that year), so moving the slider swaps the data of one trace. The color
+    range is fixed over all the years.
+    """
+    locations = np.unique(np.concatenate([partition.locations for partition in partitions]))
+    template = hovertemplate(indicator, hover)
+
+    frames = []
+    low, high = np.inf, -np.inf
+    for partition in partitions:
+        position = np.searchsorted(locations, partition.locations)
+        values = partition.values[indicator].to_numpy(dtype='float32')
+        z = np.full(len(locations), np.nan, dtype='float32')
+        z[position] = values
+        text = np.full(len(locations), '', dtype=object)
+        text[position] = partition.regions
+        frame = dict(type='choropleth', z=z, text=text)
+        if hover == 'full':
+            customdata = np.full((len(locations), len(INDICATORS)), np.nan, dtype='float32')
+            customdata[position] = partition.customdata
+            frame['customdata'] = customdata
+        frames.append(dict(name=str(partition.year), data=[frame], traces=[0]))
+        if len(values):
+            low, high = min(low, float(np.nanmin(values))), max(high, float(np.nanmax(values)))
+
+    trace = dict(type='choropleth',
+                 colorscale='viridis',
+                 locations=locations,
+                 locationmode='country names',
+                 hovertemplate=template,
+                 zmin=low, zmax=high,
+                 marker=dict(line=dict(color='lightgrey', width=0.5)),
+                 colorbar=_colorbar(colorbar))
+    if frames:
+        trace.update(frames[0]['data'][0])
+
+    steps = [dict(method='animate',
+                  args=[[frame['name']], dict(mode='immediate', frame=dict(duration=0, redraw=True),
+                                              transition=dict(duration=0))],
+                  label='Year {}'.format(frame['name']))
+             for frame in frames]
+    sliders = [dict(active=0, pad={"t": 1}, steps=steps)]
+
+    return dict(data=[trace], layout=_layout(indicator if title is None else title, sliders), frames=frames)
+
+
+def _colorbar(title):
+    return dict(title=dict(text=title, font=dict(size=15, family="Times New Roman", color="slategray")))
+
+
+def _layout(title, sliders):
+    return dict(title=dict(text=title, font=dict(size=30, family="Times New Roman", color="lightgrey")),
+                geo=dict(showframe=True, projection={'type': 'natural earth'}),
+                sliders=sliders)
+
+
+def choropleth_figures(ranking, maps=MAPS, animated=False):
+    """Figures of several maps, ``{indicator: figure}``, from one pass over ``ranking``.
+
+    ``maps`` is a list of indicator names or of ``(indicator, title, colorbar, hover)`` tuples.
+    With ``animated=True`` the maps use animation frames (``choropleth_animation``).
+    """
+    partitions = map_partitions(ranking)
+    build = choropleth_animation if animated else choropleth_figure
+    figures = {}
+    for spec in maps:
+        if isinstance(spec, str):
+            spec = (spec,)
+        figures[spec[0]] = build(partitions, *spec)
+    return figures
@@ -0,0 +1,88 @@
+"""Normalization of the indicators, group by group (by default year by year).
+
+All indicator columns are scaled together as one 2D NumPy array: the rows are
+ordered by group once and the statistics of every group are taken with
+``reduceat``, so the number of temporary arrays does not depend on the number
+of years or indicators.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .profiling import profiled
+from .schema import INDICATORS
+
+SCALERS = ('minmax', 'zscore', 'rank', 'robust')
+
+
+def _group_stats(values, codes, method):
+    """(center, scale) of every group, arrays of shape (groups, columns)."""
+    if method == 'robust':
+        quantiles = pd.DataFrame(values).groupby(codes).quantile([0.25, 0.5, 0.75])
+        q25, median, q75 = (quantiles.xs(q, level=1).to_numpy() for q in (0.25, 0.5, 0.75))
+        return median, q75 - q25
+
+    order = np.argsort(codes, kind='stable')
+    ordered = values[order]
+    starts = np.flatnonzero(np.r_[True, np.diff(codes[order]) != 0])
+
+    if method == 'minmax':
+        low = np.fmin.reduceat(ordered, starts, axis=0)
+        return low, np.fmax.reduceat(ordered, starts, axis=0) - low
+
+    #zscore, the missing values are left out (like pandas .mean() and .std())
+    valid = ~np.isnan(ordered)
+    count = np.add.reduceat(valid, starts, axis=0)
+    mean = np.add.reduceat(np.where(valid, ordered, 0.0), starts, axis=0) / count
+    ordered -= np.repeat(mean, np.diff(np.r_[starts, len(ordered)]), axis=0)
+    np.square(ordered, out=ordered)
+    square = np.add.reduceat(np.where(valid, ordered, 0.0), starts, axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return mean, np.sqrt(square / (count - 1))
+
+
+def _scaled(values, codes, method):
+    if method == 'rank':
+        return pd.DataFrame(values).groupby(codes).rank(pct=True).to_numpy()
+    center, scale = _group_stats(values, codes, method)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (values - center[codes]) / scale[codes]
+
+
+@profiled('normalize')
+def normalize_panel(data, columns=INDICATORS, method='minmax', by='Year'):
+    """Scale the ``columns`` of ``data`` within every ``by`` group (in place, ``data`` is returned).
+
+    ``method`` is one of:
+
+    - ``minmax`` - (x - min) / (max - min), range 0-1 (the scaling used in the report)
+    - ``zscore`` - (x - mean) / standard deviation
+    - ``rank`` - percentile rank, range 0-1
+    - ``robust`` - (x - median) / interquartile range
+
+    With ``by=None`` the whole data frame is one group. The rows without a
+    ``by`` value (a country without a region) are left out and become NaN.
+    """
+    if method not in SCALERS:
+        raise ValueError('unknown scaler {!r}, expected one of {}'.format(method, ', '.join(SCALERS)))
+    columns = list(columns)
+    if data.empty:
+        return data
+
+    values = data[columns].to_numpy(dtype='float64', copy=True)
+    if by is None:
+        codes = np.zeros(len(values), dtype='intp')
+    else:
+        codes = pd.factorize(data[by], sort=True)[0]
+
+    #factorize gives -1 to a missing group label
+    labelled = codes >= 0
+    if labelled.all():
+        result = _scaled(values, codes, method)
+    else:
+        result = np.full(values.shape, np.nan)
+        if labelled.any():
+            result[labelled] = _scaled(values[labelled], codes[labelled], method)
+
+    data[columns] = result
+    return data
@@ -0,0 +1,122 @@
+"""Building of the unified ``ranking`` data frame from the yearly data frames.
+
+The data frames use a compact layout: ``Region``, ``Country`` and ``ISO3``
+are categorical, ``Year`` and ``Happiness Rank`` are int16 and the indicators
+float32. The yearly data frames take the categories of ``Country`` and
+``ISO3`` from the country index, so the frames of all the years share one
+dictionary and are put together by concatenating their codes.
+"""
+
+import collections
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from .countries import country_index
+from .profiling import profiled, rows
+from .schema import COLUMNS, INDICATORS
+
+#fixed dtypes of the unified data frame
+DTYPES = dict({'Year': 'int16', 'Happiness Rank': 'int16'},
+              **{column: 'float32' for column in INDICATORS})
+
+CATEGORIES = ['Region', 'Country', 'ISO3']
+
+
+def _integer_dtype(values, dtype):
+    """``dtype`` or, when the values do not fit in it, the narrowest integer type they fit in."""
+    values = values.dropna()
+    if values.empty:
+        return dtype
+    for candidate in (dtype, 'int32', 'int64'):
+        info = np.iinfo(candidate)
+        if info.min <= values.min() and values.max() <= info.max:
+            return candidate
+    return 'int64'
+
+
+def _categories(column, values):
+    index = country_index()
+    known = {'Country': index.names.values(), 'ISO3': index.names.keys(),
+             'Region': index.regions.values()}[column]
+    return sorted(set(known).union(values.dropna().unique()))
+
+
+def compact(data):
+    """``data`` in the compact layout (a new data frame, ``data`` is not modified)."""
+    data = data.copy(deep=False)
+    for column in CATEGORIES:
+        if column in data.columns and not isinstance(data[column].dtype, pd.CategoricalDtype):
+            data[column] = pd.Categorical(data[column], categories=_categories(column, data[column]))
+    for column, dtype in DTYPES.items():
+        if column not in data.columns:
+            continue
+        if dtype.startswith('int'):
+            dtype = _integer_dtype(data[column], dtype)
+            if data[column].isna().any():
+                dtype = dtype.capitalize()
+        data[column] = data[column].astype(dtype)
+    return data
+
+
+@profiled('build_ranking')
+def build_ranking(frames):
+    """Collect the yearly data frames into one data frame with a single ``pd.concat``.
+
+    The frames are put together in one step (instead of appending year by year)
+    in the compact layout, the categorical columns share one set of categories
+    over all years (only the categories in use are kept). Rounding is left for display.
+    """
+    frames = [compact(frame[COLUMNS]) for frame in frames]
+    if not frames:
+        return empty_ranking()
+
+    for column in CATEGORIES:
+        dtypes = [frame[column].dtype for frame in frames]
+        if any(dtype != dtypes[0] for dtype in dtypes):
+            dtype = pd.CategoricalDtype(sorted(set().union(*(dtype.categories for dtype in dtypes))))
+            for frame in frames:
+                frame[column] = frame[column].astype(dtype)
+    ranking = pd.concat(frames, ignore_index=True)
+    for column in CATEGORIES:
+        ranking[column] = ranking[column].cat.remove_unused_categories()
+    return ranking
+
+
+def empty_ranking():
+    """Data frame with the columns and dtypes of ``ranking`` but no rows."""
+    ranking = pd.DataFrame({column: pd.Series(dtype=DTYPES.get(column, 'object')) for column in COLUMNS})
+    for column in CATEGORIES:
+        ranking[column] = ranking[column].astype('category')
+    return ranking
+
+
+def content_hash(data, columns=None):
+    """Hash of the values of ``columns`` of ``data`` (all the columns by default), a hex string."""
+    columns = list(data.columns if columns is None else columns)
+    digest = hashlib.sha256(pd.util.hash_pandas_object(data[columns], index=False).to_numpy().tobytes())
+    digest.update(repr(columns).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def memory_report(stages, deep=True):
+    """Memory held by the data of every stage, ``{stage name: data frame(s)}`` -> data frame.
+
+    One row per stage with the number of rows, the size in MB and the MB
+    taken by every kind of column (index, category, float32, ...).
+    """
+    records = {}
+    for name, value in stages.items():
+        frames = list(value.values()) if isinstance(value, dict) else \
+            list(value) if isinstance(value, (list, tuple)) else [value]
+        usage = collections.Counter()
+        for frame in frames:
+            usage['index'] += frame.index.memory_usage(deep=deep)
+            for column in frame.columns:
+                dtype = frame[column].dtype
+                kind = 'category' if isinstance(dtype, pd.CategoricalDtype) else str(dtype)
+                usage[kind] += frame[column].memory_usage(index=False, deep=deep)
+        records[name] = dict({'rows': rows(value), 'MB': sum(usage.values()) / 2.0 ** 20},
+                             **{kind: size / 2.0 ** 20 for kind, size in usage.items()})
+    return pd.DataFrame.from_dict(records, orient='index').fillna(0.0)
@@ -0,0 +1,24 @@
+"""Ordered parallel map used by the loaders and the report renderer."""
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+EXECUTORS = ('process', 'thread')
+
+
+def pmap(func, items, jobs=1, executor='process'):
+    """``[func(item) for item in items]`` on a pool of ``jobs`` workers.
+
+    The results are always returned in the order of ``items``. ``jobs=1`` (or
+    a single item) runs everything in the current process, ``jobs=None`` uses
+    one worker per core. ``executor`` is ``process`` or ``thread``.
+    """
+    items = list(items)
+    if jobs == 1 or len(items) <= 1:
+        return [func(item) for item in items]
+    if executor not in EXECUTORS:
+        raise ValueError('unknown executor {!r}, expected one of {}'.format(executor, ', '.join(EXECUTORS)))
+    pool = ProcessPoolExecutor if executor == 'process' else ThreadPoolExecutor
+    if jobs is not None:
+        jobs = min(jobs, len(items))
+    with pool(max_workers=jobs) as workers:
+        return list(workers.map(func, items))
@@ -0,0 +1,251 @@
+"""Opt-in timing and memory instrumentation of the pipeline stages.
+
+The stages of the pipeline (reading the csv files, resolving the countries,
+normalization, building ``ranking``, correlations, figure building and
+serialization) are wrapped with ``profiled``. When profiling is off the
+wrapper only checks one flag. When it is on, every stage records its wall
+time, CPU time, the peak of the memory allocated during the stage and the
+memory held by its output (optional, tracemalloc) and the number of rows in
+and out.
+
+The records are written either as JSON lines (one record per stage, written
+as they happen) or as a Chrome trace file (``chrome://tracing`` / Perfetto,
+written when profiling is switched off or at exit). With the environment
+variables below and a jsonl file, the worker processes of ``--jobs`` append
+their stages to the same file::
+
+    HAPPINESS_PROFILE=trace.json python -m happiness.report --out report
+    HAPPINESS_PROFILE=stages.jsonl HAPPINESS_PROFILE_MEMORY=1 python World_happiness_report_analysis.py
+
+or from Python::
+
+    with profiling.profile('trace.json', memory=True):
+        frames, ranking = load_panel()
+"""
+
+import atexit
+import contextlib
+import functools
+import json
+import multiprocessing
+import os
+import threading
+import time
+import tracemalloc
+
+import pandas as pd
+
+_state = {'on': False}
+_local = threading.local()
+_lock = threading.Lock()
+
+
+class _Profiler(object):
+
+    def __init__(self, path, format=None, memory=False):
+        self.path = path
+        self.format = format or ('jsonl' if path.endswith('.jsonl') else 'chrome')
+        self.memory = memory
+        self.events = []
+        self.start = time.perf_counter()
+        self.started_tracemalloc = False
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracemalloc = True
+        if self.format == 'jsonl':
+            self.file = open(path, 'a', encoding='utf-8')
+
+    def record(self, event):
+        with _lock:
+            if self.format == 'jsonl':
+                self.file.write(json.dumps(event) + '\n')
+                self.file.flush()
+            else:
+                self.events.append(event)
+
+    def close(self):
+        if self.format == 'jsonl':
+            self.file.close()
+        else:
+            trace = {'traceEvents': [dict(name=event['stage'], ph='X', cat='happiness',
+                                          ts=event['start'] * 1e6, dur=event['wall'] * 1e6,
+                                          pid=event['pid'], tid=event['thread'],
+                                          args={key: value for key, value in event.items()
+                                                if key not in ('stage', 'start', 'wall', 'pid', 'thread')})
+                                     for event in self.events],
+                     'displayTimeUnit': 'ms'}
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(trace, f)
+        if self.started_tracemalloc:
+            tracemalloc.stop()
+
+
+_profiler = None
+
+
+def enabled():
+    """True when the stages are being recorded."""
+    return _state['on']
+
+
+def enable(path, format=None, memory=False):
+    """Start recording the stages to ``path`` (``format``: ``chrome`` or ``jsonl``,
+    by default ``jsonl`` for ``.jsonl`` files and ``chrome`` otherwise)."""
+    global _profiler
+    disable()
+    _profiler = _Profiler(path, format, memory)
+    _state['on'] = True
+
+
+def disable():
+    """Stop recording and write the trace file."""
+    global _profiler
+    _state['on'] = False
+    if _profiler is not None:
+        profiler, _profiler = _profiler, None
+        profiler.close()
+
+
+@contextlib.contextmanager
+def profile(path, format=None, memory=False):
+    """Record the stages run inside the ``with`` block."""
+    enable(path, format, memory)
+    try:
+        yield
+    finally:
+        disable()
+
+
+def rows(value):
+    """Number of rows of a data frame, a Series or a dict/list of them (None for other values)."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return len(value.index)
+    if isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, (list, tuple)) and value and all(isinstance(item, (pd.DataFrame, pd.Series))
+                                                          for item in value):
+        return sum(len(item.index) for item in value)
+    return None
+
+
+def frame_bytes(value, deep=False):
+    """Memory of a data frame, a Series or a dict/list of them in bytes (None for other values)."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=deep).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=deep))
+    if isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, (list, tuple)) and value and all(isinstance(item, (pd.DataFrame, pd.Series))
+                                                          for item in value):
+        return sum(frame_bytes(item, deep) for item in value)
+    return None
+
+
+class _Stage(object):
+
+    def __init__(self, name, rows_in=None):
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.bytes_out = None
+        self.peak = 0
+
+    def __enter__(self):
+        profiler = _profiler
+        self.memory = profiler is not None and profiler.memory and tracemalloc.is_tracing()
+        stack = getattr(_local, 'stack', None)
+        if stack is None:
+            stack = _local.stack = []
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, peak - stack[-1].base)
+            tracemalloc.reset_peak()
+            self.base = current
+        stack.append(self)
+        self.cpu = time.process_time()
+        self.wall = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        wall = time.perf_counter() - self.wall
+        cpu = time.process_time() - self.cpu
+        stack = _local.stack
+        stack.pop()
+        profiler = _profiler
+        if profiler is None:
+            return False
+        event = dict(stage=self.name, start=self.wall - profiler.start, wall=wall, cpu=cpu,
+                     pid=os.getpid(), thread=threading.get_ident(), depth=len(stack),
+                     rows_in=self.rows_in, rows_out=self.rows_out)
+        if self.memory:
+            peak = max(self.peak, tracemalloc.get_traced_memory()[1] - self.base)
+            event['peak_mb'] = peak / 2.0 ** 20
+            if self.bytes_out is not None:
+                event['out_mb'] = self.bytes_out / 2.0 ** 20
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, peak + self.base - stack[-1].base)
+            tracemalloc.reset_peak()
+        profiler.record(event)
+        return False
+
+
+class _Nothing(object):
+    rows_out = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOTHING = _Nothing()
+
+
+def stage(name, rows_in=None):
+    """Context manager recording a stage (does nothing when profiling is off).
+
+    The ``rows_out`` attribute of the returned object can be set inside the block.
+    """
+    if not _state['on']:
+        return _NOTHING
+    return _Stage(name, rows_in)
+
+
+def profiled(name):
+    """Decorator recording every call of a function as the stage ``name``.
+
+    The rows in are counted on the first argument holding data frames and the
+    rows out on the result.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _state['on']:
+                return func(*args, **kwargs)
+            rows_in = next((count for count in map(rows, args) if count is not None), None)
+            with _Stage(name, rows_in) as record:
+                result = func(*args, **kwargs)
+                record.rows_out = rows(result)
+                if record.memory:
+                    record.bytes_out = frame_bytes(result)
+            return result
+        return wrapper
+    return decorator
+
+
+def _from_environment():
+    path = os.environ.get('HAPPINESS_PROFILE')
+    if path:
+        format = os.environ.get('HAPPINESS_PROFILE_FORMAT') or None
+        if multiprocessing.parent_process() is not None and not (format or path).endswith('jsonl'):
+            # worker processes exit without running atexit, only jsonl records survive them
+            return
+        enable(path, format,
+               os.environ.get('HAPPINESS_PROFILE_MEMORY', '') not in ('', '0'))
+        atexit.register(disable)
+
+
+_from_environment()
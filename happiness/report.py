@@ -0,0 +1,172 @@
+"""Headless rendering of the whole report.
+
+All the figures of the notebook are built from the cached panel and written
+to a folder, each figure in the requested formats (html, json and static
+images). The figures are written by a pool of processes.
+
+    python -m happiness.report --out report --format html json png --jobs 4
+
+The html files load plotly.js from one ``plotly.min.js`` written next to them
+(``--plotlyjs`` changes that). The ``bundle`` format writes all the figures
+into a single compact ``report.html`` (see ``happiness.export``). The figure
+specs are kept in ``.cache/specs`` (see ``happiness.specs``), rendering an
+unchanged panel again builds no figure.
+
+Static images (png, svg, pdf, ...) are rendered locally by plotly with the
+kaleido package.
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+from . import backends, profiling
+from .cache import CACHE_DIR, load_panel
+from .export import compact_html, write_plotlyjs
+from .maps import MAPS
+from .parallel import pmap
+from .profiling import profiled
+from .specs import SPEC_DIR, SpecCache, spec_cache
+
+FORMATS = ('html', 'json', 'png', 'svg', 'pdf', 'jpeg', 'webp', 'bundle')
+
+PLOTLYJS = ('directory', 'cdn', 'inline')
+
+
+def slug(text):
+    """File name friendly form of a text."""
+    return re.sub(r'[^a-z0-9]+', '-', str(text).lower()).strip('-')
+
+
+def correlation_figure(matrix, title='Correlation between indicators'):
+    """Figure dict of a correlation heatmap (the plotly version of the seaborn heatmap)."""
+    labels = [str(column) for column in matrix.columns]
+    return dict(data=[dict(type='heatmap',
+                           z=matrix.to_numpy(),
+                           x=labels,
+                           y=labels,
+                           colorscale='viridis',
+                           texttemplate='%{z:.1f}')],
+                layout=dict(title=dict(text=title,
+                                       font=dict(size=30, family="Times New Roman", color='slategray')),
+                            yaxis=dict(autorange='reversed'),
+                            width=800, height=700))
+
+
+@profiled('report_figures')
+def report_figures(ranking, top=10, animated=False, specs=None):
+    """All the figures of the report, ``{name: figure dict}`` in the order of the notebook.
+
+    With ``animated=True`` the maps use animation frames instead of one trace per year.
+    The specs come from ``specs`` (a ``SpecCache``, by default the shared in-memory one),
+    only the figures missing from it are built.
+    """
+    if specs is None:
+        specs = spec_cache()
+    figures = {}
+    for indicator, title, colorbar, hover in MAPS:
+        figures['map-' + slug(indicator)] = specs.figure(ranking, 'map', indicator=indicator, title=title,
+                                                         colorbar=colorbar, hover=hover, animated=animated)
+
+    figures['correlation'] = specs.figure(ranking, 'correlation')
+
+    figures['top{}'.format(top)] = specs.figure(ranking, 'top_scatter', n=top)
+    for year, figure in specs.figure(ranking, 'comparison', n=top).items():
+        figures['top{}-comparison-{}'.format(top, year)] = figure
+    return figures
+
+
+@profiled('render')
+def render(name, figure, out, formats=('html',), include_plotlyjs='directory'):
+    """Write one figure in the given formats, returns the paths of the written files.
+
+    ``include_plotlyjs`` is passed to ``plotly.io.write_html`` (``'inline'`` embeds plotly.js).
+    """
+    import plotly.io as pio
+
+    fig = backends.graph_objs().Figure(figure)
+    paths = []
+    for fmt in formats:
+        path = os.path.join(out, '{}.{}'.format(name, fmt))
+        if fmt == 'html':
+            include = True if include_plotlyjs == 'inline' else include_plotlyjs
+            pio.write_html(fig, path, include_plotlyjs=include, auto_open=False)
+        elif fmt == 'json':
+            pio.write_json(fig, path)
+        else:
+            pio.write_image(fig, path, format=fmt)
+        paths.append(path)
+    return paths
+
+
+def _render(task):
+    return render(*task)
+
+
+def render_report(out, formats=('html',), jobs=None, ranking=None, top=10, include_plotlyjs='directory',
+                  animated=False, specs=None):
+    """Build every figure of the report and write it to ``out``.
+
+    ``jobs`` is the number of worker processes (``None`` - one per core,
+    ``1`` - everything in the current process). ``specs`` is the ``SpecCache``
+    of the figures (see ``report_figures``). Returns the written paths.
+    """
+    unknown = [fmt for fmt in formats if fmt not in FORMATS]
+    if unknown:
+        raise ValueError('unknown format(s): ' + ', '.join(unknown))
+    if ranking is None:
+        ranking = load_panel()[1]
+    os.makedirs(out, exist_ok=True)
+    figures = report_figures(ranking, top, animated, specs)
+
+    paths = []
+    if 'bundle' in formats:
+        paths.append(compact_html(figures, os.path.join(out, 'report.html'), include_plotlyjs))
+    formats = tuple(fmt for fmt in formats if fmt != 'bundle')
+    if not formats:
+        return paths
+    #plotly.min.js is written once here, not by every worker
+    if 'html' in formats and include_plotlyjs == 'directory':
+        write_plotlyjs(out)
+
+    tasks = [(name, figure, out, formats, include_plotlyjs) for name, figure in figures.items()]
+    results = pmap(_render, tasks, jobs)
+    return paths + [path for written in results for path in written]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Render all the figures of the report to a folder.')
+    parser.add_argument('--out', default='report', help='output folder (default: report)')
+    parser.add_argument('--format', nargs='+', default=['html'], choices=FORMATS, dest='formats',
+                        help='output formats (default: html)')
+    parser.add_argument('--jobs', type=int, default=None,
+                        help='number of worker processes (default: one per core, 1: no pool)')
+    parser.add_argument('--plotlyjs', default='directory', choices=PLOTLYJS,
+                        help='how the html files load plotly.js (default: one plotly.min.js in the folder)')
+    parser.add_argument('--top', type=int, default=10, help='number of countries in the top charts')
+    parser.add_argument('--animated', action='store_true', help='maps with animation frames')
+    parser.add_argument('--no-spec-cache', action='store_true',
+                        help='do not keep the figure specs in {} nor the per-year artefacts in {}'.format(
+                            SPEC_DIR, CACHE_DIR))
+    parser.add_argument('--profile', metavar='PATH',
+                        help='record the pipeline stages to a Chrome trace (or .jsonl) file')
+    args = parser.parse_args(argv)
+    if args.profile:
+        profiling.enable(args.profile)
+
+    start = time.perf_counter()
+    specs = SpecCache(directory=None if args.no_spec_cache else SPEC_DIR,
+                      artefact_dir=None if args.no_spec_cache else CACHE_DIR)
+    paths = render_report(args.out, args.formats, args.jobs, top=args.top, include_plotlyjs=args.plotlyjs,
+                          animated=args.animated, specs=specs)
+    print('{} files written to {} in {:.1f} s'.format(len(paths), args.out, time.perf_counter() - start))
+    if args.profile:
+        profiling.disable()
+        print('stages recorded to {}'.format(args.profile))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
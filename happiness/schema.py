@@ -0,0 +1,132 @@
+"""Per-year schema registry for the World Happiness Report csv files.
+
+Every report year publishes its own column names. Instead of a hand written
+``rename`` per year, each year is described once here and the loader
+(``happiness.loader``) reads all of them the same way. Adding a new report
+year means adding one entry to ``YEARS``.
+"""
+
+#indicators kept for the analysis, in the order used by the report
+INDICATORS = ['Happiness Score', 'Economy (GDP per Capita)', 'Family', 'Health (Life Expectancy)',
+              'Freedom', 'Trust (Government Corruption)', 'Generosity']
+
+#columns of the unified data frame
+COLUMNS = ['Region', 'Country', 'ISO3', 'Year', 'Happiness Rank'] + INDICATORS
+
+
+class YearSchema(object):
+    """Description of a single report year.
+
+    ``columns`` maps the csv column names onto the unified names. ``region``
+    is either the name of a csv column or ``None`` when the file has no region
+    and it has to be taken from the country index (``happiness/countries.csv``).
+    ``rank`` is the csv column
+    holding the happiness rank, or ``None`` when the rank is derived from the
+    row order of the file (the file is sorted by the happiness score).
+    """
+
+    def __init__(self, year, filename, columns, region=None, rank=None):
+        self.year = year
+        self.filename = filename
+        self.columns = dict(columns)
+        self.region = region
+        self.rank = rank
+
+    def usecols(self):
+        """Names of the csv columns that have to be read."""
+        cols = list(self.columns)
+        for extra in (self.region, self.rank):
+            if extra is not None and extra not in cols:
+                cols.append(extra)
+        return cols
+
+    def dtypes(self):
+        """Explicit dtypes for ``pd.read_csv``."""
+        dtype = {}
+        for source, target in self.columns.items():
+            dtype[source] = 'float64' if target in INDICATORS else 'object'
+        if self.region is not None:
+            dtype[self.region] = 'object'
+        if self.rank is not None:
+            dtype[self.rank] = 'int64'
+        return dtype
+
+    def __repr__(self):
+        return 'YearSchema({!r}, {!r})'.format(self.year, self.filename)
+
+
+YEARS = {}
+
+
+def register(schema):
+    """Add a year to the registry (replacing an existing entry)."""
+    YEARS[schema.year] = schema
+    return schema
+
+
+register(YearSchema(2015, '2015.csv',
+                    {'Country': 'Country',
+                     'Happiness Score': 'Happiness Score',
+                     'Economy (GDP per Capita)': 'Economy (GDP per Capita)',
+                     'Family': 'Family',
+                     'Health (Life Expectancy)': 'Health (Life Expectancy)',
+                     'Freedom': 'Freedom',
+                     'Trust (Government Corruption)': 'Trust (Government Corruption)',
+                     'Generosity': 'Generosity'},
+                    region='Region', rank='Happiness Rank'))
+
+register(YearSchema(2016, '2016.csv',
+                    {'Country': 'Country',
+                     'Happiness Score': 'Happiness Score',
+                     'Economy (GDP per Capita)': 'Economy (GDP per Capita)',
+                     'Family': 'Family',
+                     'Health (Life Expectancy)': 'Health (Life Expectancy)',
+                     'Freedom': 'Freedom',
+                     'Trust (Government Corruption)': 'Trust (Government Corruption)',
+                     'Generosity': 'Generosity'},
+                    region='Region', rank='Happiness Rank'))
+
+register(YearSchema(2017, '2017.csv',
+                    {'Country': 'Country',
+                     'Happiness.Score': 'Happiness Score',
+                     'Economy..GDP.per.Capita.': 'Economy (GDP per Capita)',
+                     'Family': 'Family',
+                     'Health..Life.Expectancy.': 'Health (Life Expectancy)',
+                     'Freedom': 'Freedom',
+                     'Trust..Government.Corruption.': 'Trust (Government Corruption)',
+                     'Generosity': 'Generosity'},
+                    rank='Happiness.Rank'))
+
+register(YearSchema(2018, '2018.csv',
+                    {'Country or region': 'Country',
+                     'Score': 'Happiness Score',
+                     'GDP per capita': 'Economy (GDP per Capita)',
+                     'Social support': 'Family',
+                     'Healthy life expectancy': 'Health (Life Expectancy)',
+                     'Freedom to make life choices': 'Freedom',
+                     'Perceptions of corruption': 'Trust (Government Corruption)',
+                     'Generosity': 'Generosity'},
+                    rank='Overall rank'))
+
+register(YearSchema(2019, '2019.csv',
+                    {'Country or region': 'Country',
+                     'Score': 'Happiness Score',
+                     'GDP per capita': 'Economy (GDP per Capita)',
+                     'Social support': 'Family',
+                     'Healthy life expectancy': 'Health (Life Expectancy)',
+                     'Freedom to make life choices': 'Freedom',
+                     'Perceptions of corruption': 'Trust (Government Corruption)',
+                     'Generosity': 'Generosity'},
+                    rank='Overall rank'))
+
+#the 2020 file has no rank column, the rank is recalculated from the row order
+register(YearSchema(2020, '2020.csv',
+                    {'Country name': 'Country',
+                     'Ladder score': 'Happiness Score',
+                     'Logged GDP per capita': 'Economy (GDP per Capita)',
+                     'Social support': 'Family',
+                     'Healthy life expectancy': 'Health (Life Expectancy)',
+                     'Freedom to make life choices': 'Freedom',
+                     'Perceptions of corruption': 'Trust (Government Corruption)',
+                     'Generosity': 'Generosity'},
+                    region='Regional indicator'))
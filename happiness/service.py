@@ -0,0 +1,479 @@
+"""Local HTTP query service over ``ranking``.
+
+The panel is loaded once and the questions of the dashboards are answered
+from memory instead of by running the whole script::
+
+    python -m happiness.service --port 8765
+
+    GET /slice?indicator=Freedom&region=Western Europe&years=2016-2019
+    GET /slice?country=FIN&country=Denmark&format=arrow
+    GET /correlation?years=2019&method=spearman&by=Region
+    GET /figure/map?indicator=Freedom
+    GET /figure/top?n=10&year=2018
+    GET /stats
+
+Lists are given comma separated or as repeated parameters (countries only
+repeated, their names may hold commas), ``years`` also as ranges
+(``2015-2017``). Indicators may be shortened to the part before
+the bracket (``economy``, ``health``). Slices and correlation matrices are
+returned as JSON or, with ``format=arrow``, as an Arrow IPC stream (needs
+pyarrow); figures are plotly JSON. Invalid queries are answered with 400,
+selections without data with 404 and errors of the service with 500.
+
+Every response is cached in a bounded LRU cache under the normalized query,
+so the same question asked with the parameters in another order or spelling
+is a cache hit. The handlers run in a thread pool, a slow query does not hold
+up the others. ``TestClient`` calls the service directly, without a socket.
+"""
+
+import argparse
+import asyncio
+import collections
+import io
+import json
+import re
+import threading
+import traceback
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+import pandas as pd
+
+from .artefacts import YearArtefacts
+from .cache import CACHE_DIR, load_panel
+from .correlation import CORR_COLUMNS, METHODS, Correlations
+from .countries import country_index
+from .maps import MAPS, choropleth_animation, choropleth_figure
+from .report import correlation_figure
+from .schema import INDICATORS
+from .topn import comparison_figures, long_format, top_scatter_figure
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+FORMATS = ('json', 'arrow')
+
+CONTENT_TYPES = {'json': 'application/json', 'arrow': 'application/vnd.apache.arrow.stream'}
+
+#number of responses kept in the cache
+CACHE_SIZE = 256
+
+#columns of the slices besides the indicators
+KEYS = ['Region', 'Country', 'ISO3', 'Year']
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+            500: 'Internal Server Error'}
+
+
+class QueryError(ValueError):
+    """Invalid query, answered with ``400 Bad Request``."""
+
+
+class NoData(LookupError):
+    """Selection without data, answered with ``404 Not Found``."""
+
+
+class ResponseCache(object):
+    """Thread-safe LRU cache of the responses with hit and miss counters."""
+
+    def __init__(self, size=CACHE_SIZE):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._items = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key):
+        with self._lock:
+            if key in self._items:
+                self.hits += 1
+                self._items.move_to_end(key)
+                return self._items[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def stats(self):
+        return dict(size=len(self._items), limit=self.size, hits=self.hits, misses=self.misses)
+
+
+class Response(object):
+    """Status, content type and body of an answer."""
+
+    def __init__(self, status, content_type, body):
+        self.status = status
+        self.content_type = content_type
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body)
+
+    def frame(self):
+        """The body as a data frame (Arrow or JSON records)."""
+        if self.content_type == CONTENT_TYPES['arrow']:
+            return pa.ipc.open_stream(self.body).read_pandas()
+        return pd.DataFrame(self.json())
+
+
+def _values(params, name, split=True):
+    """All the values of a parameter, repeated or (with ``split``) comma separated."""
+    items = params.get(name, [])
+    if split:
+        items = [value for item in items for value in item.split(',')]
+    return [value.strip() for value in items if value.strip()]
+
+
+def _value(params, name, default=None):
+    values = _values(params, name)
+    if len(values) > 1:
+        raise QueryError('{} takes a single value'.format(name))
+    return values[0] if values else default
+
+
+def _integer(params, name, default=None):
+    value = _value(params, name)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise QueryError('{} must be an integer, got {!r}'.format(name, value))
+
+
+def _years(params):
+    """Sorted tuple of the years of ``years`` (``2016``, ``2016-2019``), None for all the years."""
+    years = set()
+    for value in _values(params, 'years') + _values(params, 'year'):
+        match = re.fullmatch(r'(\d{4})(?:\s*[-:]\s*(\d{4}))?', value)
+        if match is None:
+            raise QueryError('invalid year {!r}'.format(value))
+        first = int(match.group(1))
+        years.update(range(first, int(match.group(2) or first) + 1))
+    return tuple(sorted(years)) or None
+
+
+def _column(name, columns=CORR_COLUMNS):
+    """Column matching ``name`` exactly or by the part before the bracket, case-insensitive."""
+    key = name.casefold()
+    for column in columns:
+        if key in (column.casefold(), column.split(' (')[0].casefold()):
+            return column
+    raise QueryError('unknown indicator {!r}'.format(name))
+
+
+def _columns(params, columns=CORR_COLUMNS):
+    """Indicators of the query in the order of ``columns``, None for all of them."""
+    names = _values(params, 'indicator') + _values(params, 'indicators')
+    if not names:
+        return None
+    chosen = {_column(name, columns) for name in names}
+    return tuple(column for column in columns if column in chosen)
+
+
+def _choice(params, name, choices, default):
+    value = _value(params, name, default)
+    if value not in choices:
+        raise QueryError('{} must be one of {}, got {!r}'.format(name, ', '.join(map(str, choices)), value))
+    return value
+
+
+def _format(params):
+    format = _choice(params, 'format', FORMATS, 'json')
+    if format == 'arrow' and pa is None:
+        raise QueryError('format=arrow needs pyarrow')
+    return format
+
+
+class QueryService(object):
+    """Answers the queries from one loaded ``ranking``.
+
+    ``handle(target)`` answers a request target (path and query string) with
+    a ``Response``; ``serve`` runs it as an asyncio HTTP server. The derived
+    data (correlations, map partitions, top tables) is built on first use.
+    """
+
+    routes = {'/slice': 'slice', '/correlation': 'correlation', '/figure/map': 'map_figure',
+              '/figure/top': 'top_figure', '/figure/correlation': 'correlation_figure', '/stats': 'stats'}
+
+    def __init__(self, ranking, cache_size=CACHE_SIZE, artefact_dir=None):
+        self.cache = ResponseCache(cache_size)
+        self.artefacts = YearArtefacts(directory=artefact_dir)
+        self._lock = threading.Lock()
+        self.reload(ranking)
+
+    @classmethod
+    def from_panel(cls, cache_size=CACHE_SIZE, **kwargs):
+        """Service over the cached panel (``kwargs`` are passed to ``load_panel``), the per-year
+        artefacts are kept in the same cache folder."""
+        frames, ranking = load_panel(**kwargs)
+        return cls(ranking, cache_size, artefact_dir=kwargs.get('cache_dir', CACHE_DIR))
+
+    def reload(self, ranking):
+        """Serve a new ``ranking``, the cached responses are dropped.
+
+        The per-year artefacts are kept for the years whose data did not change.
+        """
+        with self._lock:
+            self.ranking = ranking
+            #the responses are cached by the service, the matrices are not kept twice
+            self.correlations = Correlations(ranking, cache=False)
+            self.artefacts.refresh(ranking)
+            self._long = {}
+            self.cache.clear()
+
+    def partitions(self):
+        with self._lock:
+            return self.artefacts.partitions()
+
+    def long(self, n):
+        with self._lock:
+            if n not in self._long:
+                self._long[n] = long_format(self.artefacts.top(n))
+            return self._long[n]
+
+    def handle(self, target, method='GET'):
+        """Answer one request target, e.g. ``/slice?indicator=Freedom&years=2016-2019``."""
+        if method not in ('GET', 'HEAD'):
+            return _error(405, 'only GET requests are served')
+        url = urlsplit(target)
+        route = self.routes.get(url.path.rstrip('/') or '/')
+        if route is None:
+            return _error(404, 'unknown path {!r}, expected one of {}'.format(url.path, ', '.join(self.routes)))
+        if route == 'stats':
+            return _json(dict(cache=self.cache.stats(), rows=len(self.ranking.index)))
+        params = parse_qs(url.query)
+        try:
+            key = getattr(self, '_' + route + '_query')(params)
+        except QueryError as error:
+            return _error(400, str(error))
+
+        key = (route,) + key
+        response = self.cache.get(key)
+        if response is None:
+            try:
+                response = getattr(self, route)(*key[1:])
+            except NoData as error:
+                return _error(404, error.args[0])
+            except Exception as error:
+                traceback.print_exc()
+                return _error(500, '{}: {}'.format(type(error).__name__, error))
+            self.cache.put(key, response)
+        return response
+
+    #every route has a _<route>_query method normalizing the parameters into the cache key
+    #and a <route> method answering the normalized query
+
+    def _slice_query(self, params):
+        regions = tuple(sorted(set(_values(params, 'region'))))
+        countries = []
+        index = country_index()
+        for name in _values(params, 'country', split=False):
+            code = name.upper() if name.upper() in index.names else index.code(name)
+            if code is None:
+                raise QueryError('unknown country {!r}'.format(name))
+            countries.append(code)
+        columns = _columns(params, ['Happiness Rank'] + INDICATORS)
+        return (_years(params), regions or None, tuple(sorted(set(countries))) or None, columns,
+                _format(params))
+
+    def slice(self, years, regions, countries, columns, format):
+        data = self.ranking
+        mask = None
+        for column, values in (('Year', years), ('Region', regions), ('ISO3', countries)):
+            if values is not None:
+                selected = data[column].isin(values).to_numpy()
+                mask = selected if mask is None else mask & selected
+        if mask is not None:
+            data = data[mask]
+        if data.empty:
+            raise NoData('no rows match the selection')
+        data = data[KEYS + list(columns or ['Happiness Rank'] + INDICATORS)]
+        return _frame(data.reset_index(drop=True), format)
+
+    def _correlation_query(self, params):
+        return (_years(params), _columns(params), _choice(params, 'method', METHODS, 'pearson'),
+                _choice(params, 'by', ('none', 'Year', 'Region'), 'none'),
+                _format(params))
+
+    def _check_years(self, years):
+        if years is not None and not self.ranking['Year'].isin(years).any():
+            raise NoData('no data for {}'.format(', '.join(map(str, years))))
+
+    def correlation(self, years, columns, method, by, format):
+        self._check_years(years)
+        if by == 'Year':
+            with self._lock:
+                matrices = {year: matrix.loc[list(columns), list(columns)] if columns else matrix
+                            for year, matrix in self.artefacts.correlations(method).items()
+                            if years is None or year in years}
+        else:
+            matrices = self.correlations.by(None if by == 'none' else by, years, columns, method)
+        matrices = {'all' if group is None else str(group): matrix for group, matrix in matrices.items()}
+        if format == 'arrow':
+            frames = [matrix.rename_axis('Indicator').reset_index().assign(Group=group)
+                      for group, matrix in matrices.items()]
+            return _frame(pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(), format)
+        return _json({group: json.loads(matrix.to_json(orient='split')) for group, matrix in matrices.items()})
+
+    def _map_figure_query(self, params):
+        indicator = _column(_value(params, 'indicator', 'Happiness Score'))
+        spec = {spec[0]: spec for spec in MAPS}.get(indicator, (indicator,))
+        return (spec, _value(params, 'animated', '0') not in ('0', 'false', 'no'))
+
+    def map_figure(self, spec, animated):
+        build = choropleth_animation if animated else choropleth_figure
+        return _figure(build(self.partitions(), *spec))
+
+    def _top_figure_query(self, params):
+        n = _integer(params, 'n', 10)
+        if not 1 <= n <= 200:
+            raise QueryError('n must be between 1 and 200')
+        return (n, _column(_value(params, 'indicator', 'Happiness Score')), _integer(params, 'year'))
+
+    def top_figure(self, n, indicator, year):
+        long = self.long(n)
+        if year is None:
+            return _figure(top_scatter_figure(long, n, indicator))
+        figures = comparison_figures(long[long['Year'] == year], n)
+        if year not in figures:
+            raise NoData('no data for {}'.format(year))
+        return _figure(figures[year])
+
+    def _correlation_figure_query(self, params):
+        return (_years(params), _columns(params), _choice(params, 'method', METHODS, 'pearson'))
+
+    def correlation_figure(self, years, columns, method):
+        self._check_years(years)
+        return _figure(correlation_figure(self.correlations.matrix(years, columns, method)))
+
+    async def _connection(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line.strip():
+                    break
+                headers = {}
+                while True:
+                    header = await reader.readline()
+                    if header in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = header.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                parts = line.decode('latin-1').split()
+                if len(parts) != 3:
+                    response = _error(400, 'malformed request line')
+                    method, version = 'GET', 'HTTP/1.0'
+                else:
+                    method, target, version = parts
+                    try:
+                        response = await loop.run_in_executor(None, self.handle, target, method)
+                    except Exception as error:
+                        traceback.print_exc()
+                        response = _error(500, '{}: {}'.format(type(error).__name__, error))
+                keep_alive = (version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                              and len(parts) == 3)
+                writer.write(_http(response, method, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host='127.0.0.1', port=8765):
+        """Start listening, returns the ``asyncio`` server."""
+        return await asyncio.start_server(self._connection, host, port)
+
+    def serve(self, host='127.0.0.1', port=8765):
+        """Run the HTTP server until interrupted."""
+        async def run():
+            server = await self.start(host, port)
+            async with server:
+                await server.serve_forever()
+        asyncio.run(run())
+
+
+class TestClient(object):
+    """Sends requests to a ``QueryService`` in process, no socket is opened.
+
+    ``client.get('/slice', indicator='Freedom', years='2016-2019')`` returns a ``Response``.
+    """
+
+    __test__ = False
+
+    def __init__(self, service):
+        self.service = service
+
+    def get(self, path, **params):
+        if params:
+            path += ('&' if '?' in path else '?') + urlencode(params, doseq=True)
+        return self.service.handle(path)
+
+
+def _json(value, status=200):
+    return Response(status, CONTENT_TYPES['json'], json.dumps(value, allow_nan=False).encode('utf-8'))
+
+
+def _error(status, message):
+    return _json(dict(error=message), status)
+
+
+def _frame(data, format):
+    if format == 'arrow':
+        table = pa.Table.from_pandas(data, preserve_index=False)
+        sink = io.BytesIO()
+        with pa.ipc.new_stream(sink, table.schema) as stream:
+            stream.write_table(table)
+        return Response(200, CONTENT_TYPES['arrow'], sink.getvalue())
+    return Response(200, CONTENT_TYPES['json'], data.to_json(orient='records').encode('utf-8'))
+
+
+def _figure(figure):
+    import plotly.io
+    return Response(200, CONTENT_TYPES['json'], plotly.io.to_json(figure, validate=False).encode('utf-8'))
+
+
+def _http(response, method, keep_alive):
+    body = b'' if method == 'HEAD' else response.body
+    head = ['HTTP/1.1 {} {}'.format(response.status, _REASONS.get(response.status, '')),
+            'Content-Type: ' + response.content_type,
+            'Content-Length: {}'.format(len(response.body)),
+            'Access-Control-Allow-Origin: *',
+            'Connection: ' + ('keep-alive' if keep_alive else 'close')]
+    return ('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve slices, correlations and figures of the panel over HTTP.')
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8765, help='port (default: 8765)')
+    parser.add_argument('--cache-size', type=int, default=CACHE_SIZE,
+                        help='number of cached responses (default: {})'.format(CACHE_SIZE))
+    args = parser.parse_args(argv)
+
+    service = QueryService.from_panel(args.cache_size)
+    print('serving {} rows on http://{}:{}/'.format(len(service.ranking.index), args.host, args.port))
+    try:
+        service.serve(args.host, args.port)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+"""Countries with similar indicators ("countries like X").
+
+Every country-year is a point in the space of the normalized indicators. The
+index keeps one array of points per year and answers nearest neighbour
+queries with blocked matrix products (the squared distances of a block of
+queries to all the countries of the year in one BLAS call), so a batch of
+thousands of queries costs a few matrix multiplications::
+
+    index = SimilarityIndex(ranking)
+    index.nearest('Poland', 2019, k=5)
+    index.nearest(['Poland', 'Czech Republic'], 2019)
+    index.within_region(2019, 'Western Europe')
+
+Missing indicators are skipped: the distance is taken over the indicators
+present in both countries and scaled up to all the indicators. The answers
+are cached per year and dropped only for the years whose data changed
+(``refresh``).
+"""
+
+import numpy as np
+import pandas as pd
+
+from .countries import country_index
+from .panel import content_hash
+from .profiling import profiled
+from .schema import INDICATORS
+
+#the normalized indicators making up the feature vector (the score is their sum, so it is left out)
+FEATURES = [column for column in INDICATORS if column != 'Happiness Score']
+
+#number of queries per block of the distance matrix
+BLOCK = 1024
+
+
+class _Year(object):
+    """Points of one year."""
+
+    def __init__(self, data, features, key):
+        self.key = key
+        self.countries = data['Country'].astype(str).to_numpy()
+        self.codes = data['ISO3'].astype(str).to_numpy()
+        self.regions = data['Region'].astype(str).to_numpy()
+        values = data[features].to_numpy(dtype='float64')
+        self.mask = ~np.isnan(values)
+        self.values = np.where(self.mask, values, 0.0)
+        self.squares = self.values * self.values
+        self.norms = self.squares.sum(axis=1)
+        #without missing values the distances need a single matrix product
+        self.complete = bool(self.mask.all())
+        self.rows = {}
+        for i, (country, code) in enumerate(zip(self.countries, self.codes)):
+            self.rows.setdefault(country, i)
+            self.rows.setdefault(code, i)
+        self.results = {}
+
+    def squared_distances(self, rows):
+        """Squared distances of the points ``rows`` to all the points, shape (len(rows), points)."""
+        x = self.values[rows]
+        if self.complete:
+            squared = self.norms[rows][:, None] + self.norms[None, :] - 2.0 * (x @ self.values.T)
+            return np.maximum(squared, 0.0, out=squared)
+        m, mask = self.mask[rows].astype('float64'), self.mask.astype('float64')
+        squared = self.squares[rows] @ mask.T + m @ self.squares.T - 2.0 * (x @ self.values.T)
+        present = m @ mask.T
+        with np.errstate(invalid='ignore', divide='ignore'):
+            squared = np.maximum(squared, 0.0) * (self.values.shape[1] / present)
+        squared[present == 0] = np.nan
+        return squared
+
+
+class SimilarityIndex(object):
+    """Nearest neighbour index over the normalized indicators of ``ranking``, one per year."""
+
+    def __init__(self, ranking, features=FEATURES, block=BLOCK):
+        self.features = list(features)
+        self.block = block
+        self._years = {}
+        self.refresh(ranking)
+
+    @property
+    def years(self):
+        return sorted(self._years)
+
+    def refresh(self, ranking):
+        """Take the data of ``ranking``, rebuilding only the years whose data changed.
+
+        Returns the list of the rebuilt years.
+        """
+        rebuilt = []
+        present = set()
+        for year, data in ranking.groupby('Year', sort=True, observed=True):
+            year = int(year)
+            present.add(year)
+            key = content_hash(data, ['Country', 'Region'] + self.features)
+            if year not in self._years or self._years[year].key != key:
+                self._years[year] = _Year(data.reset_index(drop=True), self.features, key)
+                rebuilt.append(year)
+        for year in set(self._years) - present:
+            del self._years[year]
+        return rebuilt
+
+    def _year(self, year):
+        if year not in self._years:
+            raise KeyError('no data for {}'.format(year))
+        return self._years[year]
+
+    def _row(self, points, country):
+        row = points.rows.get(country)
+        if row is None:
+            code = country_index().code(country)
+            row = points.rows.get(code)
+        if row is None:
+            raise KeyError('{} is not in the data of the year'.format(country))
+        return row
+
+    def nearest(self, countries, year, k=5):
+        """The ``k`` countries closest to every country of ``countries`` (a name, an ISO-3 code or a list).
+
+        One row per query and neighbour: ``Query``, ``Neighbour`` (1 - the closest),
+        ``Country``, ``ISO3``, ``Region`` and ``Distance``.
+        """
+        if isinstance(countries, str):
+            countries = [countries]
+        points = self._year(year)
+        rows = tuple(self._row(points, country) for country in countries)
+        key = ('nearest', rows, k)
+        if key not in points.results:
+            points.results[key] = self._nearest(points, np.array(rows, dtype='intp'), k)
+        return points.results[key]
+
+    def nearest_all(self, year, k=5):
+        """The ``k`` nearest countries of every country of ``year`` (same columns as ``nearest``)."""
+        points = self._year(year)
+        key = ('nearest', None, k)
+        if key not in points.results:
+            points.results[key] = self._nearest(points, np.arange(len(points.countries)), k)
+        return points.results[key]
+
+    @profiled('nearest')
+    def _nearest(self, points, rows, k):
+        if k < 1:
+            raise ValueError('k must be at least 1')
+        k = min(k, len(points.countries) - 1)
+        neighbours, distances = [], []
+        for start in range(0, len(rows) if k else 0, self.block):
+            block = rows[start:start + self.block]
+            distance = points.squared_distances(block)
+            #a country is not its own neighbour, countries without any common indicator come last
+            distance[np.arange(len(block)), block] = np.inf
+            if not points.complete:
+                distance[np.isnan(distance)] = np.inf
+            nearest = np.argpartition(distance, k - 1, axis=1)[:, :k]
+            chosen = np.sqrt(np.take_along_axis(distance, nearest, axis=1))
+            order = np.argsort(chosen, axis=1, kind='stable')
+            neighbours.append(np.take_along_axis(nearest, order, axis=1))
+            distances.append(np.take_along_axis(chosen, order, axis=1))
+        neighbours = np.concatenate(neighbours) if neighbours else np.empty((0, k), dtype='intp')
+        distances = np.concatenate(distances) if distances else np.empty((0, k))
+
+        flat = neighbours.ravel()
+        return pd.DataFrame({'Query': np.repeat(points.countries[rows], k),
+                             'Neighbour': np.tile(np.arange(1, k + 1), len(rows)),
+                             'Country': points.countries[flat],
+                             'ISO3': points.codes[flat],
+                             'Region': points.regions[flat],
+                             'Distance': np.where(np.isinf(distances.ravel()), np.nan, distances.ravel())})
+
+    def within_region(self, year, region):
+        """Distances between all the countries of ``region`` in ``year``, a square data frame."""
+        points = self._year(year)
+        key = ('region', region)
+        if key not in points.results:
+            rows = np.flatnonzero(points.regions == region)
+            if len(rows) == 0:
+                raise KeyError('no countries of {} in {}'.format(region, year))
+            names = points.countries[rows]
+            distance = np.sqrt(points.squared_distances(rows)[:, rows])
+            np.fill_diagonal(distance, np.where(np.isnan(np.diag(distance)), np.nan, 0.0))
+            points.results[key] = pd.DataFrame(distance, index=pd.Index(names, name='Country'),
+                                               columns=pd.Index(names, name='Country'))
+        return points.results[key]
@@ -0,0 +1,252 @@
+"""Memoized figure specs.
+
+Building a figure dict (the traces of every year, the slider steps, the
+layout) depends only on the panel and on the parameters of the builder, so
+the specs are kept under the key (panel hash, builder, parameters)::
+
+    specs = spec_cache()
+    fig = specs.figure(ranking, 'map', indicator='Freedom')
+    fig = specs.figure(ranking, 'top_scatter', n=10)
+
+The specs are kept in memory in an LRU cache limited by their size in bytes
+and, optionally, in a folder of pickle files limited the same way, so a
+report rendered again from an unchanged panel builds nothing.
+"""
+
+import collections
+import hashlib
+import os
+import pickle
+import threading
+
+import numpy as np
+
+from .artefacts import YearArtefacts
+from .cache import CACHE_DIR
+from .correlation import Correlations
+from .maps import choropleth_animation, choropleth_figure
+from .panel import content_hash
+from .profiling import profiled
+from .topn import comparison_figures, long_format, top_scatter_figure
+
+#bump when the builders change, so old spec files are not used
+SPEC_VERSION = 1
+
+SPEC_DIR = os.path.join(CACHE_DIR, 'specs')
+
+MEMORY_BYTES = 64 * 2 ** 20
+DISK_BYTES = 512 * 2 ** 20
+
+
+def panel_hash(ranking):
+    """Hash of the content of ``ranking``.
+
+    It is computed on every call (about a millisecond for the report panel),
+    so a panel modified in place never gets the specs of its old content.
+    """
+    return content_hash(ranking)
+
+
+def nbytes(value):
+    """Approximate size of a figure spec in bytes."""
+    if isinstance(value, np.ndarray):
+        if value.dtype == object:
+            return value.nbytes + sum(nbytes(item) for item in value.flat)
+        return value.nbytes
+    if isinstance(value, (str, bytes)):
+        return len(value) + 49
+    if isinstance(value, dict):
+        return 64 + sum(nbytes(key) + nbytes(item) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return 56 + sum(nbytes(item) for item in value)
+    return 16
+
+
+class _Inputs(object):
+    """Data shared by the builders of one panel, prepared on first use.
+
+    The map partitions and the top rows come from the per-year ``artefacts``,
+    so a panel with one year more builds them only for that year.
+    """
+
+    def __init__(self, ranking, artefacts):
+        self.ranking = ranking
+        self.artefacts = artefacts
+        self._long = {}
+        self._correlations = None
+
+    def partitions(self):
+        return self.artefacts.partitions()
+
+    def long(self, n):
+        if n not in self._long:
+            self._long[n] = long_format(self.artefacts.top(n))
+        return self._long[n]
+
+    def correlations(self):
+        if self._correlations is None:
+            self._correlations = Correlations(self.ranking)
+        return self._correlations
+
+
+def _map(inputs, indicator, title=None, colorbar='Indicator', hover='region', animated=False):
+    build = choropleth_animation if animated else choropleth_figure
+    return build(inputs.partitions(), indicator, title, colorbar, hover)
+
+
+def _top_scatter(inputs, n=10, indicator='Happiness Score'):
+    return top_scatter_figure(inputs.long(n), n, indicator)
+
+
+def _comparison(inputs, n=10):
+    return comparison_figures(inputs.long(n), n)
+
+
+def _correlation(inputs, years=None, indicators=None, method='pearson', title='Correlation between indicators'):
+    from .report import correlation_figure
+    return correlation_figure(inputs.correlations().matrix(years, indicators, method), title)
+
+
+#builders by name, called with the shared inputs of the panel and the parameters
+BUILDERS = {'map': _map, 'top_scatter': _top_scatter, 'comparison': _comparison, 'correlation': _correlation}
+
+
+def _frozen(value):
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = [_frozen(item) for item in value]
+        return tuple(sorted(items) if isinstance(value, (set, frozenset)) else items)
+    return value
+
+
+class SpecCache(object):
+    """Figure specs cached in memory (LRU, ``max_bytes``) and optionally in ``directory`` (``disk_bytes``).
+
+    The per-year inputs of the builders are kept in ``artefacts`` (a
+    ``YearArtefacts``, with its files in ``artefact_dir`` when given).
+    ``stats()`` reports the hits of both tiers, the misses and the evictions.
+    """
+
+    def __init__(self, max_bytes=MEMORY_BYTES, directory=None, disk_bytes=DISK_BYTES, artefact_dir=None):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.disk_bytes = disk_bytes
+        self.artefacts = YearArtefacts(directory=artefact_dir)
+        self.bytes = 0
+        self.counts = collections.Counter()
+        self._items = collections.OrderedDict()
+        self._inputs = (None, None)
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def key(self, ranking, builder, **params):
+        """Cache key of a spec: (panel hash, builder, sorted parameters)."""
+        return (panel_hash(ranking), builder, tuple(sorted((name, _frozen(value)) for name, value in params.items())))
+
+    def figure(self, ranking, builder, **params):
+        """Spec built by ``BUILDERS[builder]`` from ``ranking``, from the cache when possible."""
+        if builder not in BUILDERS:
+            raise ValueError('unknown builder {!r}, expected one of {}'.format(builder, ', '.join(BUILDERS)))
+        key = self.key(ranking, builder, **params)
+        with self._lock:
+            if key in self._items:
+                self.counts['hits'] += 1
+                self._items.move_to_end(key)
+                return self._items[key][0]
+            spec = self._read(key)
+            if spec is not None:
+                self.counts['disk_hits'] += 1
+            else:
+                self.counts['misses'] += 1
+                spec = self._build(ranking, key[0], builder, params)
+                self._write(key, spec)
+            self._remember(key, spec)
+            return spec
+
+    @profiled('build_spec')
+    def _build(self, ranking, panel, builder, params):
+        if self._inputs[0] != panel:
+            self.artefacts.refresh(ranking)
+            self._inputs = (panel, _Inputs(ranking, self.artefacts))
+        return BUILDERS[builder](self._inputs[1], **params)
+
+    def _remember(self, key, spec):
+        size = nbytes(spec)
+        if size > self.max_bytes:
+            self.counts['too_large'] += 1
+            return
+        self._items[key] = (spec, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, (_, evicted) = self._items.popitem(last=False)
+            self.bytes -= evicted
+            self.counts['evictions'] += 1
+
+    def _file(self, key):
+        digest = hashlib.sha256(repr((SPEC_VERSION,) + key).encode('utf-8')).hexdigest()[:24]
+        return os.path.join(self.directory, '{}-{}.pkl'.format(key[1], digest))
+
+    def _read(self, key):
+        if self.directory is None:
+            return None
+        path = self._file(key)
+        try:
+            with open(path, 'rb') as f:
+                spec = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        os.utime(path)
+        return spec
+
+    def _write(self, key, spec):
+        if self.directory is None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._file(key)
+        tmp = '{}.{}.tmp'.format(path, os.getpid())
+        with open(tmp, 'wb') as f:
+            pickle.dump(spec, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        self._trim()
+
+    def _trim(self):
+        """Delete the least recently used spec files over ``disk_bytes``."""
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.pkl'):
+                stat = entry.stat()
+                files.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self.counts['disk_evictions'] += 1
+
+    def clear(self):
+        """Forget the specs kept in memory (the files stay)."""
+        with self._lock:
+            self._items.clear()
+            self._inputs = (None, None)
+            self.bytes = 0
+
+    def stats(self):
+        counts = {name: self.counts[name]
+                  for name in ('hits', 'disk_hits', 'misses', 'evictions', 'disk_evictions', 'too_large')}
+        return dict(counts, entries=len(self._items), bytes=self.bytes, max_bytes=self.max_bytes)
+
+
+_default = None
+
+
+def spec_cache():
+    """The in-memory spec cache shared by the notebook and the report (created once)."""
+    global _default
+    if _default is None:
+        _default = SpecCache()
+    return _default
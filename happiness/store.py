@@ -0,0 +1,92 @@
+"""Dense country x year x indicator view of ``ranking``.
+
+The panel is kept as one NumPy array of shape (countries, years, indicators)
+with NaN for the missing entries. Questions across the years become slicing
+instead of boolean filtering of the whole data frame::
+
+    store = PanelStore(ranking)
+    store.trajectory('Finland', 'Freedom')      # Finland over the years
+    store.cross_section(2018, 'Economy (GDP per Capita)')   # all countries in 2018
+"""
+
+import numpy as np
+import pandas as pd
+
+from .schema import INDICATORS
+
+STORE_COLUMNS = ['Happiness Rank'] + INDICATORS
+
+
+class PanelStore(object):
+    """Country x year x indicator array built from ``ranking``.
+
+    ``countries``, ``years`` and ``indicators`` are the labels of the three
+    axes; the positions of the labels are looked up in dictionaries. The data
+    frames returned by the accessors are views of the array, they should be
+    copied before being modified.
+    """
+
+    def __init__(self, ranking, indicators=STORE_COLUMNS, dtype='float64'):
+        country = ranking['Country']
+        if isinstance(country.dtype, pd.CategoricalDtype):
+            codes, countries = country.cat.codes.to_numpy(), country.cat.categories
+        else:
+            codes, countries = pd.factorize(country, sort=True)
+        years, year_codes = np.unique(ranking['Year'].to_numpy(), return_inverse=True)
+
+        self.countries = pd.Index(countries, name='Country')
+        self.years = pd.Index(years, name='Year')
+        self.indicators = pd.Index(list(indicators), name='Indicator')
+        self.regions = ranking.groupby('Country', observed=True)['Region'].last().reindex(self.countries)
+
+        self.array = np.full((len(self.countries), len(self.years), len(self.indicators)), np.nan, dtype=dtype)
+        self.array[codes, year_codes] = ranking[list(self.indicators)].to_numpy(dtype=dtype)
+
+        self._country = {name: i for i, name in enumerate(self.countries)}
+        self._year = {year: i for i, year in enumerate(self.years)}
+        self._indicator = {name: i for i, name in enumerate(self.indicators)}
+
+    @property
+    def shape(self):
+        return self.array.shape
+
+    def ids(self, country=None, year=None, indicator=None):
+        """Positions of the labels on the axes (``None`` - the whole axis)."""
+        return (slice(None) if country is None else self._country[country],
+                slice(None) if year is None else self._year[year],
+                slice(None) if indicator is None else self._indicator[indicator])
+
+    def value(self, country, year, indicator):
+        """Single value (NaN when missing)."""
+        return self.array[self.ids(country, year, indicator)]
+
+    def trajectory(self, country, indicator):
+        """Values of one country over the years, a Series indexed by year."""
+        return pd.Series(self.array[self.ids(country, None, indicator)], index=self.years,
+                         name=indicator, copy=False)
+
+    def cross_section(self, year, indicator):
+        """Values of all the countries in one year, a Series indexed by country."""
+        return pd.Series(self.array[self.ids(None, year, indicator)], index=self.countries,
+                         name=indicator, copy=False)
+
+    def year_frame(self, year):
+        """Countries x indicators of one year."""
+        return pd.DataFrame(self.array[:, self._year[year], :], index=self.countries,
+                            columns=self.indicators, copy=False)
+
+    def country_frame(self, country):
+        """Years x indicators of one country."""
+        return pd.DataFrame(self.array[self._country[country]], index=self.years,
+                            columns=self.indicators, copy=False)
+
+    def indicator_frame(self, indicator):
+        """Countries x years of one indicator."""
+        return pd.DataFrame(self.array[:, :, self._indicator[indicator]], index=self.countries,
+                            columns=self.years, copy=False)
+
+    def tidy(self, dropna=True):
+        """Long format: one row per country, year and indicator."""
+        index = pd.MultiIndex.from_product([self.countries, self.years, self.indicators])
+        tidy = pd.Series(self.array.reshape(-1), index=index, name='Value').reset_index()
+        return tidy.dropna(subset=['Value']).reset_index(drop=True) if dropna else tidy
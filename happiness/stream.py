@@ -0,0 +1,132 @@
+"""Chunked ingest of respondent-level (microdata) csv files.
+
+Files with one row per respondent (millions of rows) are read in chunks and
+reduced to running per-country aggregates (weight, mean and sum of squared
+deviations, merged chunk by chunk with the parallel variance formula), so the
+memory used depends on the number of countries, not on the size of the file.
+The country level result goes through the same country index and
+normalization as the yearly report files::
+
+    stats = aggregate_csv('gallup2021.csv', 'country', {'life_ladder': 'Happiness Score', ...},
+                          weight='wgt')
+    data2021 = country_year_frame(stats, 2021)
+"""
+
+import numpy as np
+import pandas as pd
+
+from .countries import country_index
+from .normalize import normalize_panel
+from .panel import compact
+from .schema import COLUMNS, INDICATORS
+
+CHUNKSIZE = 200000
+
+
+class RunningStats(object):
+    """Per-group running count, weight, mean and variance of several columns."""
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self.count = None
+        self.weight = None
+        self.mean = None
+        self.m2 = None
+        self.weighted = False
+
+    def update(self, groups, values, weights=None):
+        """Add a chunk: ``groups`` - Series of group labels, ``values`` - data frame of ``columns``."""
+        x = values[self.columns].to_numpy(dtype='float64')
+        valid = ~np.isnan(x)
+        if weights is None:
+            w = valid.astype('float64')
+        else:
+            self.weighted = True
+            w = np.where(valid, weights.to_numpy(dtype='float64')[:, None], 0.0)
+        x = np.where(valid, x, 0.0)
+
+        k = len(self.columns)
+        sums = pd.DataFrame(np.hstack([valid, w, w * x, w * x * x]), index=pd.Index(groups.to_numpy()))
+        sums = sums.groupby(level=0, sort=False).sum()
+        count, weight, wx, wxx = (sums.iloc[:, i * k:(i + 1) * k].to_numpy() for i in range(4))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(weight > 0, wx / weight, 0.0)
+        m2 = np.maximum(wxx - weight * mean * mean, 0.0)
+
+        chunk = [pd.DataFrame(a, index=sums.index, columns=self.columns) for a in (count, weight, mean, m2)]
+        if self.count is None:
+            self.count, self.weight, self.mean, self.m2 = chunk
+            return self
+        self._merge(*chunk)
+        return self
+
+    def _merge(self, count, weight, mean, m2):
+        index = self.count.index.union(count.index, sort=False)
+        old = [frame.reindex(index, fill_value=0.0) for frame in (self.count, self.weight, self.mean, self.m2)]
+        new = [frame.reindex(index, fill_value=0.0) for frame in (count, weight, mean, m2)]
+        total = old[1] + new[1]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            share = (new[1] / total).fillna(0.0)
+            delta = new[2] - old[2]
+            self.mean = old[2] + delta * share
+            self.m2 = old[3] + new[3] + delta * delta * old[1] * share
+        self.count = old[0] + new[0]
+        self.weight = total
+
+    def result(self):
+        """Data frame indexed by group with ``<column>``, ``<column> count`` and ``<column> variance``.
+
+        The variance is the sample variance without weights and the weighted
+        (population) variance with weights.
+        """
+        if self.count is None:
+            return pd.DataFrame(columns=[c + suffix for c in self.columns for suffix in ('', ' count', ' variance')])
+        with np.errstate(invalid='ignore', divide='ignore'):
+            variance = self.m2 / (self.weight if self.weighted else self.weight - 1)
+        result = pd.DataFrame(index=self.count.index)
+        for column in self.columns:
+            result[column] = self.mean[column].where(self.weight[column] > 0)
+            result[column + ' count'] = self.count[column].astype('int64')
+            result[column + ' variance'] = variance[column].where(self.weight[column] > 0)
+        return result
+
+
+def aggregate_csv(path, country, columns, weight=None, chunksize=CHUNKSIZE, **read_csv):
+    """Stream a respondent-level csv file and aggregate it per country.
+
+    ``columns`` maps the csv columns onto the unified indicator names (a list
+    keeps the names). Returns a data frame with one row per country (column
+    ``Country``) with the mean, count and variance of every indicator.
+    """
+    if not isinstance(columns, dict):
+        columns = {column: column for column in columns}
+    usecols = [country] + list(columns) + ([weight] if weight else [])
+    stats = RunningStats(list(columns.values()))
+    for chunk in pd.read_csv(path, usecols=usecols, chunksize=chunksize, **read_csv):
+        chunk = chunk.rename(columns=columns)
+        stats.update(chunk[country], chunk, None if weight is None else chunk[weight])
+    result = stats.result()
+    result.index.name = 'Country'
+    return result.reset_index()
+
+
+def country_year_frame(aggregated, year, scaler='minmax'):
+    """Country level data frame of ``year`` in the unified format from ``aggregate_csv``.
+
+    The countries are resolved through the country index (region and ISO-3
+    code), the rank is derived from the mean ``Happiness Score`` and the
+    indicators are normalized like the yearly report files. Indicators missing
+    from the microdata are left empty.
+    """
+    data = aggregated[['Country'] + [column for column in INDICATORS if column in aggregated]].copy()
+    for column in INDICATORS:
+        if column not in data:
+            data[column] = np.nan
+    data = country_index().attach(data, region=True)
+    data['Year'] = year
+    data['Happiness Rank'] = data['Happiness Score'].rank(ascending=False, method='min').astype('Int64')
+    data = data.sort_values('Happiness Rank', kind='stable').reset_index(drop=True)
+    data = data[COLUMNS]
+    if scaler is not None:
+        data = normalize_panel(data, method=scaler, by=None)
+    return compact(data)
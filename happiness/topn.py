@@ -0,0 +1,82 @@
+"""Top N countries of every year and the scatter charts comparing them.
+
+The top countries are chosen by ``Happiness Rank`` (not by the order of the
+rows in the file) with one partial sort per group, and all the traces are
+generated from a single long-format data frame.
+"""
+
+from .profiling import profiled
+from .schema import INDICATORS
+
+#colors of the years and of the compared indicators
+COLORS = ['#481567', '#33638D', '#238A8D', '#29AF7F', '#B8DE29', '#FDE725']
+COMPARED = ['Economy (GDP per Capita)', 'Freedom', 'Trust (Government Corruption)', 'Health (Life Expectancy)']
+COMPARED_COLORS = ['#481567', '#33638D', '#238A8D', '#FDE725']
+
+
+@profiled('top_n')
+def top_n(ranking, n=10, by='Year', region=False):
+    """Rows of the ``n`` best ranked countries of every year (and of every region with ``region=True``).
+
+    The rows are ordered by group and by rank.
+    """
+    keys = [by, 'Region'] if region else [by]
+    ranks = ranking.groupby(keys, observed=True, sort=True)['Happiness Rank'].nsmallest(n)
+    return ranking.loc[ranks.index.get_level_values(-1)].reset_index(drop=True)
+
+
+def long_format(top, indicators=INDICATORS):
+    """``top`` as a long-format data frame: Year, Region, Country, Happiness Rank, Indicator, Value."""
+    return top.melt(id_vars=['Year', 'Region', 'Country', 'Happiness Rank'], value_vars=list(indicators),
+                    var_name='Indicator', value_name='Value')
+
+
+def _trace(data, name, color, mode):
+    return dict(type='scatter',
+                x=data['Country'].astype(str).to_numpy(),
+                y=data['Value'].to_numpy(),
+                mode=mode,
+                name=str(name),
+                marker=dict(color=color),
+                text=data['Country'].astype(str).to_numpy())
+
+
+def year_traces(long, indicator='Happiness Score', colors=COLORS):
+    """One trace per year with the ``indicator`` of its top countries."""
+    data = long[long['Indicator'] == indicator]
+    return [_trace(group, year, colors[i % len(colors)], 'markers')
+            for i, (year, group) in enumerate(data.groupby('Year', sort=True))]
+
+
+def indicator_traces(long, indicators=COMPARED, colors=COMPARED_COLORS):
+    """Traces of one year's top countries, one trace per indicator, ``{year: [traces]}``."""
+    order = {indicator: i for i, indicator in enumerate(indicators)}
+    data = long[long['Indicator'].isin(order)]
+    traces = {}
+    for (year, indicator), group in data.groupby(['Year', 'Indicator'], sort=True):
+        traces.setdefault(year, [None] * len(indicators))[order[indicator]] = \
+            _trace(group, indicator, colors[order[indicator] % len(colors)], 'lines+markers')
+    return traces
+
+
+@profiled('top_scatter_figure')
+def top_scatter_figure(long, n=10, indicator='Happiness Score'):
+    """Figure dict: ``indicator`` of the top ``n`` countries, one trace per year."""
+    layout = dict(title='Happiness level change for the top {} countries'.format(n),
+                  xaxis=dict(title='Country', ticklen=5, zeroline=False),
+                  yaxis=dict(title='Happiness indicator', ticklen=5, zeroline=False),
+                  hovermode="x unified")
+    return dict(data=year_traces(long, indicator), layout=layout)
+
+
+@profiled('comparison_figures')
+def comparison_figures(long, n=10, indicators=COMPARED):
+    """Figure dicts comparing ``indicators`` of the top ``n`` countries, ``{year: figure}``."""
+    figures = {}
+    for year, traces in indicator_traces(long, indicators).items():
+        layout = dict(title='GDP - Freedom - Trust in the government - Life expectancy' + '<br>' +
+                      'Comparison for the {} happiest countries in {}'.format(n, year),
+                      xaxis=dict(title='Kraje', ticklen=5, zeroline=False),
+                      hovermode="x unified")
+        figures[year] = dict(data=[trace for trace in traces if trace is not None], layout=layout)
+    return figures
@@ -0,0 +1,84 @@
+"""Changes of the indicators and of the ranking from year to year.
+
+All the statistics are computed for every country and indicator at once with
+grouped ``diff``/``rolling`` over ``ranking`` sorted by country and year, and
+they are cached for the charts.
+"""
+
+import pandas as pd
+
+from .schema import INDICATORS
+
+
+class Trends(object):
+    """Year over year changes of ``ranking``."""
+
+    def __init__(self, ranking, indicators=INDICATORS, window=3):
+        self.indicators = list(indicators)
+        self.window = window
+        self.panel = ranking.sort_values(['Country', 'Year'], kind='stable').reset_index(drop=True)
+        self._cache = {}
+
+    def _cached(self, key, compute):
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def changes(self):
+        """One row per country and year: the change of every indicator since the previous report
+        of the country (``<indicator> change``), ``Year Gap`` and ``Rank Movement``
+        (places gained in the ranking, positive - up)."""
+        return self._cached('changes', self._changes)
+
+    def _changes(self):
+        panel = self.panel
+        grouped = panel.groupby('Country', observed=True, sort=False)
+        deltas = grouped[['Year'] + self.indicators].diff()
+
+        changes = panel[['Region', 'Country', 'Year', 'Happiness Rank']].copy()
+        changes['Year Gap'] = deltas['Year']
+        changes['Rank Movement'] = grouped['Happiness Rank'].shift() - panel['Happiness Rank']
+        for column in self.indicators:
+            changes[column + ' change'] = deltas[column]
+        return changes
+
+    def volatility(self, window=None):
+        """Rolling standard deviation of the year over year changes over ``window`` reports."""
+        window = self.window if window is None else window
+        return self._cached(('volatility', window), lambda: self._volatility(window))
+
+    def _volatility(self, window):
+        changes = self.changes()
+        columns = ['Rank Movement'] + [column + ' change' for column in self.indicators]
+        rolling = (changes.groupby('Country', observed=True, sort=False)[columns]
+                   .rolling(window, min_periods=2).std()
+                   .reset_index(level=0, drop=True)
+                   .sort_index())
+        volatility = changes[['Region', 'Country', 'Year']].copy()
+        for column in columns:
+            volatility[column.replace(' change', '') + ' volatility'] = rolling[column]
+        return volatility
+
+    def movers(self, year, column='Rank Movement', n=10):
+        """Biggest risers and fallers of ``year`` by ``column`` of ``changes()``, ``(risers, fallers)``."""
+        def compute():
+            changes = self.changes()
+            data = changes[(changes['Year'] == year) & changes[column].notna()]
+            return (data.nlargest(n, column).reset_index(drop=True),
+                    data.nsmallest(n, column).reset_index(drop=True))
+        return self._cached(('movers', year, column, n), compute)
+
+    def summary(self):
+        """Change of every indicator between the first and the last report of every country
+        (a change is missing when the indicator is missing in either report)."""
+        def compute():
+            #whole rows: first()/last() would take every column from a different year past the gaps
+            grouped = self.panel.groupby('Country', observed=True, sort=True)
+            first, last = grouped.nth(0).set_index('Country'), grouped.nth(-1).set_index('Country')
+            summary = pd.DataFrame({'Region': last['Region'], 'First Year': first['Year'],
+                                    'Last Year': last['Year'],
+                                    'Rank Movement': first['Happiness Rank'] - last['Happiness Rank']})
+            for column in self.indicators:
+                summary[column + ' change'] = last[column] - first[column]
+            return summary.reset_index()
+        return self._cached('summary', compute)
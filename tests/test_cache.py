@@ -0,0 +1,44 @@
+import os
+import shutil
+
+from happiness.cache import RANKING_FILES, load_panel, load_year_cached, remove_stale
+from happiness.loader import DATA_DIR
+
+
+def cached(cache_dir, prefix):
+    return sorted(name for name in os.listdir(cache_dir) if name.startswith(prefix))
+
+
+def test_edited_csv_replaces_the_year_file(tmp_path):
+    shutil.copy(os.path.join(DATA_DIR, '2016.csv'), str(tmp_path))
+    cache_dir = str(tmp_path / 'cache')
+    load_year_cached(2016, str(tmp_path), cache_dir)
+    before = cached(cache_dir, 'year-2016-')
+    with open(str(tmp_path / '2016.csv'), 'a') as f:
+        f.write('\n')
+    load_year_cached(2016, str(tmp_path), cache_dir)
+    after = cached(cache_dir, 'year-2016-')
+    assert len(before) == len(after) == 1 and before != after
+
+
+def test_only_the_recent_ranking_files_are_kept(tmp_path):
+    cache_dir = str(tmp_path)
+    count = RANKING_FILES + 3
+    for i in range(count):
+        path = os.path.join(cache_dir, 'ranking-{}.feather'.format(i))
+        open(path, 'w').close()
+        os.utime(path, ns=(i * 10 ** 9, i * 10 ** 9))
+    keep = os.path.join(cache_dir, 'ranking-0.feather')
+    remove_stale(cache_dir, 'ranking-', keep=[keep], max_files=RANKING_FILES - 1)
+    expected = ['ranking-{}.feather'.format(i) for i in range(count - RANKING_FILES + 1, count)]
+    expected.append('ranking-0.feather')
+    assert cached(cache_dir, 'ranking-') == sorted(expected)
+
+
+def test_load_panel_keeps_the_files_it_reads(tmp_path):
+    cache_dir = str(tmp_path)
+    load_panel([2015, 2016], cache_dir=cache_dir)
+    load_panel([2015], cache_dir=cache_dir)
+    frames, ranking = load_panel([2015, 2016], cache_dir=cache_dir)
+    assert len(cached(cache_dir, 'ranking-')) == 2
+    assert len(cached(cache_dir, 'year-')) == 2 and len(ranking) == sum(len(frame) for frame in frames.values())
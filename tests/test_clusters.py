@@ -0,0 +1,85 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from happiness.cache import load_panel
+from happiness.clusters import Profiles, _filled, _matching, kmeans
+
+
+def lloyd(values, centroids, max_iter=100, tol=1e-6):
+    """Plain Lloyd iterations of one group."""
+    centroids = centroids.copy()
+    for _ in range(max_iter):
+        labels = ((values[:, None, :] - centroids[None]) ** 2).sum(axis=2).argmin(axis=1)
+        updated = np.array([values[labels == j].mean(axis=0) if (labels == j).any() else centroids[j]
+                            for j in range(len(centroids))])
+        moved = np.sqrt(((updated - centroids) ** 2).sum(axis=1)).max()
+        centroids = updated
+        if moved <= tol:
+            break
+    return centroids, ((values[:, None, :] - centroids[None]) ** 2).sum(axis=2).argmin(axis=1)
+
+
+@pytest.fixture(scope='module')
+def ranking(tmp_path_factory):
+    return load_panel(cache_dir=str(tmp_path_factory.mktemp('cache')))[1]
+
+
+def test_batched_kmeans_matches_lloyd_per_group():
+    rng = np.random.default_rng(0)
+    sizes = [50, 80, 30]
+    values = rng.normal(size=(sum(sizes), 3))
+    codes = np.repeat(np.arange(len(sizes)), sizes)
+    start = np.stack([values[codes == g][:4] for g in range(len(sizes))])
+    centroids, labels, distances, iterations = kmeans(values, codes, start)
+    for g in range(len(sizes)):
+        expected, expected_labels = lloyd(values[codes == g], start[g])
+        np.testing.assert_allclose(centroids[g], expected, atol=1e-9)
+        np.testing.assert_array_equal(labels[codes == g], expected_labels)
+    np.testing.assert_allclose(distances, np.sqrt(((values - centroids[codes, labels]) ** 2).sum(axis=1)))
+    assert (iterations >= 1).all()
+
+
+def test_matching_finds_the_cheapest_permutation():
+    rng = np.random.default_rng(1)
+    for k in (2, 4, 6):
+        cost = rng.uniform(size=(k, k))
+        best = min(itertools.permutations(range(k)), key=lambda p: cost[np.arange(k), list(p)].sum())
+        assert cost[np.arange(k), _matching(cost)].sum() == pytest.approx(cost[np.arange(k), list(best)].sum())
+
+
+def test_profiles_are_converged_clusterings(ranking):
+    profiles = Profiles(ranking, k=4)
+    labels = profiles.labels()
+    centroids = profiles.centroids()
+    for year, data in labels.groupby('Year'):
+        members = ranking[ranking['Year'] == year]
+        assert data['Country'].tolist() == members['Country'].tolist()
+        #every country is in the cluster of its nearest centroid and the centroids are the means of their clusters
+        values = _filled(members, profiles.features)
+        year_centroids = centroids.loc[year].to_numpy()
+        nearest = ((values[:, None, :] - year_centroids[None]) ** 2).sum(axis=2).argmin(axis=1)
+        np.testing.assert_array_equal(data['Cluster'], nearest)
+        for cluster in np.unique(nearest):
+            np.testing.assert_allclose(year_centroids[cluster], values[nearest == cluster].mean(axis=0), atol=1e-5)
+    iterations = profiles.iterations()
+    assert iterations.index.tolist() == profiles.years
+    assert (iterations['Total'] == iterations['From pooled'] + iterations['From previous year']).all()
+    assert centroids.shape == (4 * len(profiles.years), len(profiles.features))
+
+
+def test_refresh_clusters_only_the_changed_years(ranking):
+    profiles = Profiles(ranking, k=4)
+    before = profiles.centroids().copy()
+    changed = ranking.copy()
+    changed.loc[changed['Year'] == 2019, 'Freedom'] = changed.loc[changed['Year'] == 2019, 'Freedom'] * 0.5
+    assert profiles.refresh(changed) == [2019]
+    after = profiles.centroids()
+    for year in profiles.years:
+        if year != 2019:
+            np.testing.assert_array_equal(after.loc[year], before.loc[year])
+    assert profiles.iterations().loc[2019, 'From pooled'] == 0
+    assert profiles.refresh(changed) == []
+    assert profiles.refresh(changed[changed['Year'] != 2015]) == []
+    assert profiles.years == [2016, 2017, 2018, 2019, 2020]
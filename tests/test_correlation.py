@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from happiness.cache import load_panel
+from happiness.correlation import CORR_COLUMNS, METHODS, Correlations
+
+
+@pytest.fixture(scope='module')
+def ranking(tmp_path_factory):
+    ranking = load_panel(cache_dir=str(tmp_path_factory.mktemp('cache')))[1].copy()
+    #missing values in a few columns, so the pairwise handling is exercised
+    rng = np.random.default_rng(0)
+    for column in ('Freedom', 'Generosity', 'Trust (Government Corruption)'):
+        ranking.loc[rng.choice(len(ranking), 40, replace=False), column] = np.nan
+    return ranking
+
+
+def expected(data, method, columns=CORR_COLUMNS):
+    return data[columns].astype('float64').corr(method=method)
+
+
+@pytest.fixture(params=METHODS)
+def method(request):
+    if request.param == 'kendall':
+        pytest.importorskip('scipy')
+    return request.param
+
+
+def test_whole_panel(ranking, method):
+    pd.testing.assert_frame_equal(Correlations(ranking).matrix(method=method), expected(ranking, method))
+
+
+def test_selected_years_and_indicators(ranking, method):
+    columns = ['Happiness Score', 'Freedom', 'Generosity']
+    result = Correlations(ranking).matrix([2016, 2019], columns, method)
+    pd.testing.assert_frame_equal(result, expected(ranking[ranking['Year'].isin([2016, 2019])], method, columns))
+
+
+@pytest.mark.parametrize('group', ['Year', 'Region'])
+def test_by_group(ranking, method, group):
+    matrices = Correlations(ranking).by(group, method=method)
+    groups = ranking.groupby(group, observed=True)
+    assert sorted(matrices) == sorted(groups.groups)
+    for label, data in groups:
+        label = label[0] if isinstance(label, tuple) else label
+        pd.testing.assert_frame_equal(matrices[label], expected(data, method), atol=1e-12)
+
+
+def test_empty_selection(ranking, method):
+    correlations = Correlations(ranking)
+    assert correlations.by('Year', years=[1999], method=method) == {}
+    matrix = correlations.matrix(years=[1999], method=method)
+    assert list(matrix.columns) == CORR_COLUMNS and matrix.isna().all().all()
+
+
+def test_unknown_method(ranking):
+    with pytest.raises(ValueError):
+        Correlations(ranking).matrix(method='cosine')
@@ -0,0 +1,80 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from happiness.artefacts import YearArtefacts
+from happiness.cache import load_panel
+from happiness.correlation import Correlations
+from happiness.incremental import append_year
+from happiness.loader import DATA_DIR
+from happiness.maps import map_partitions
+from happiness.schema import YEARS, YearSchema
+from happiness.specs import SpecCache
+from happiness.topn import top_n
+
+EARLIER = list(range(2015, 2021))
+
+
+@pytest.fixture
+def folders(tmp_path):
+    """Data folder with the report files and a 2021 file (a copy of 2020), and a cache folder."""
+    for year in EARLIER:
+        shutil.copy(os.path.join(DATA_DIR, YEARS[year].filename), str(tmp_path))
+    shutil.copy(os.path.join(DATA_DIR, '2020.csv'), str(tmp_path / '2021.csv'))
+    source = YEARS[2020]
+    schema = YearSchema(2021, '2021.csv', source.columns, source.region, source.rank)
+    yield str(tmp_path), str(tmp_path / 'cache'), schema
+    YEARS.pop(2021, None)
+
+
+def check_artefacts(artefacts, ranking):
+    pd.testing.assert_frame_equal(artefacts.top(10), top_n(ranking, 10))
+    expected = Correlations(ranking).by('Year')
+    for year, matrix in artefacts.correlations().items():
+        pd.testing.assert_frame_equal(matrix, expected[year])
+    for partition, other in zip(artefacts.partitions(), map_partitions(ranking)):
+        assert partition.year == other.year
+        np.testing.assert_array_equal(partition.locations, other.locations)
+        np.testing.assert_array_equal(partition.customdata, other.customdata)
+
+
+def test_append_builds_only_the_new_year(folders):
+    data_dir, cache_dir, schema = folders
+    ranking = load_panel(EARLIER, data_dir, cache_dir)[1]
+    artefacts = YearArtefacts(ranking, directory=cache_dir)
+    assert artefacts.counts['built'] == len(EARLIER)
+
+    data, appended = append_year(2021, schema, data_dir, cache_dir)
+    assert artefacts.refresh(appended) == []
+    assert artefacts.counts['read'] == 1 and artefacts.counts['reused'] == len(EARLIER)
+
+    #a new process (the next report) reads every year from the cache
+    fresh = YearArtefacts(appended, directory=cache_dir)
+    assert fresh.counts == {'read': len(EARLIER) + 1}
+    check_artefacts(fresh, appended)
+
+
+def test_in_memory_refresh_builds_only_the_new_year(folders):
+    data_dir, cache_dir, schema = folders
+    ranking = load_panel(EARLIER, data_dir, cache_dir)[1]
+    artefacts = YearArtefacts(ranking)
+    appended = append_year(2021, schema, data_dir, cache_dir)[1]
+    assert artefacts.refresh(appended) == [2021]
+    check_artefacts(artefacts, appended)
+    assert artefacts.refresh(appended[appended['Year'] != 2015]) == []
+    assert artefacts.years == list(range(2016, 2022))
+
+
+def test_spec_cache_keeps_the_artefacts_of_the_earlier_years(folders):
+    data_dir, cache_dir, schema = folders
+    ranking = load_panel(EARLIER, data_dir, cache_dir)[1]
+    specs = SpecCache()
+    specs.figure(ranking, 'map', indicator='Freedom')
+    specs.figure(ranking, 'top_scatter', n=10)
+    appended = append_year(2021, schema, data_dir, cache_dir)[1]
+    figure = specs.figure(appended, 'map', indicator='Freedom')
+    assert specs.artefacts.counts['built'] == len(EARLIER) + 1
+    assert [step['label'] for step in figure['layout']['sliders'][0]['steps']][-1] == 'Year 2021'
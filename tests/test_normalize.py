@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from happiness.normalize import SCALERS, normalize_panel
+
+
+def expected(data, columns, method, by):
+    grouped = data.groupby(by)[columns] if by is not None else data[columns].groupby(np.zeros(len(data)))
+    values = data[columns]
+    if method == 'minmax':
+        low = grouped.transform('min')
+        return (values - low) / (grouped.transform('max') - low)
+    if method == 'zscore':
+        return (values - grouped.transform('mean')) / grouped.transform('std')
+    if method == 'rank':
+        return grouped.rank(pct=True)
+    median = grouped.transform('median')
+    return (values - median) / (grouped.transform(lambda x: x.quantile(0.75)) -
+                                grouped.transform(lambda x: x.quantile(0.25)))
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame({'Region': rng.choice(['Africa', 'Asia', 'Europe', None], 200),
+                         'Year': rng.choice([2015, 2016, 2017], 200),
+                         'a': rng.normal(size=200), 'b': rng.uniform(size=200)})
+    data.loc[rng.choice(200, 20, replace=False), 'a'] = np.nan
+    return data
+
+
+@pytest.mark.parametrize('method', SCALERS)
+@pytest.mark.parametrize('by', ['Year', 'Region', None])
+def test_matches_groupby_transform(data, method, by):
+    result = normalize_panel(data.copy(), ['a', 'b'], method, by)
+    pd.testing.assert_frame_equal(result[['a', 'b']], expected(data, ['a', 'b'], method, by))
+
+
+def test_categorical_groups_with_missing_labels(data):
+    data['Region'] = data['Region'].astype('category')
+    result = normalize_panel(data.copy(), ['a', 'b'], 'minmax', 'Region')
+    assert result.loc[data['Region'].isna(), ['a', 'b']].isna().all().all()
+    pd.testing.assert_frame_equal(result[['a', 'b']], expected(data, ['a', 'b'], 'minmax', 'Region'))
+
+
+def test_missing_group_label_is_left_out():
+    data = pd.DataFrame({'g': ['a', 'a', 'b', 'b', None], 'x': [0, 10, 100, 200, 5]})
+    assert normalize_panel(data, ['x'], by='g')['x'].tolist()[:4] == [0.0, 1.0, 0.0, 1.0]
+    assert np.isnan(data['x'].iloc[4])
+
+
+def test_no_labelled_rows():
+    data = pd.DataFrame({'g': [None, None], 'x': [1.0, 2.0]})
+    assert normalize_panel(data, ['x'], by='g')['x'].isna().all()
@@ -0,0 +1,62 @@
+import pytest
+
+from happiness.service import QueryService, TestClient
+
+
+@pytest.fixture(scope='module')
+def client(tmp_path_factory):
+    return TestClient(QueryService.from_panel(cache_dir=str(tmp_path_factory.mktemp('cache'))))
+
+
+def test_slice_filters_years_region_and_indicator(client):
+    response = client.get('/slice', indicator='Freedom', region='Western Europe', years='2016-2019')
+    assert response.status == 200
+    rows = response.json()
+    assert rows and {row['Year'] for row in rows} == {2016, 2017, 2018, 2019}
+    assert {row['Region'] for row in rows} == {'Western Europe'}
+    assert set(rows[0]) == {'Region', 'Country', 'ISO3', 'Year', 'Freedom'}
+
+
+def test_normalized_query_is_a_cache_hit(client):
+    first = client.get('/slice?years=2016-2017&indicator=freedom')
+    hits = client.service.cache.hits
+    second = client.get('/slice?indicator=Freedom&years=2017,2016')
+    assert second is first
+    assert client.service.cache.hits == hits + 1
+
+
+def test_country_names_with_commas(client):
+    response = client.get('/slice', country='Hong Kong S.A.R., China', years=2017)
+    assert response.status == 200
+    assert [row['ISO3'] for row in response.json()] == ['HKG']
+
+
+def test_arrow_and_json_give_the_same_rows(client):
+    arrow = client.get('/slice', country=['FIN', 'Denmark'], format='arrow')
+    json = client.get('/slice', country=['FIN', 'Denmark'])
+    assert arrow.content_type == 'application/vnd.apache.arrow.stream'
+    assert arrow.frame()['ISO3'].tolist() == json.frame()['ISO3'].tolist()
+
+
+def test_correlation_by_region(client):
+    matrices = client.get('/correlation', years=2019, method='spearman', by='Region').json()
+    assert 'Western Europe' in matrices
+    assert matrices['Western Europe']['columns'][0] == 'Happiness Rank'
+
+
+def test_errors(client):
+    assert client.get('/slice', years='abc').status == 400
+    assert client.get('/slice', country='Atlantis').status == 400
+    assert client.get('/correlation', years=1999).status == 404
+    assert client.get('/figure/correlation', years=1999).status == 404
+    assert client.get('/figure/top', year=1999).status == 404
+    assert client.get('/nowhere').status == 404
+
+
+def test_failing_handler_gives_500(client, monkeypatch):
+    def fail(*args):
+        raise RuntimeError('broken')
+    monkeypatch.setattr(client.service, 'top_figure', fail)
+    response = client.get('/figure/top', n=3)
+    assert response.status == 500
+    assert 'broken' in response.json()['error']
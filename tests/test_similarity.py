@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from happiness.cache import load_panel
+from happiness.similarity import FEATURES, SimilarityIndex, _Year
+
+
+def brute_force(values):
+    """Distances over the features present in both points, scaled up to all the features."""
+    n, width = values.shape
+    distances = np.full((n, n), np.nan)
+    for i in range(n):
+        for j in range(n):
+            both = ~np.isnan(values[i]) & ~np.isnan(values[j])
+            if both.any():
+                distances[i, j] = np.sqrt(((values[i, both] - values[j, both]) ** 2).sum() * width / both.sum())
+    return distances
+
+
+def year_frame(values):
+    names = ['C{}'.format(i) for i in range(len(values))]
+    data = pd.DataFrame(values, columns=FEATURES[:values.shape[1]])
+    return data.assign(Country=names, ISO3=names, Region=['R{}'.format(i % 3) for i in range(len(values))])
+
+
+@pytest.fixture
+def values():
+    rng = np.random.default_rng(0)
+    values = rng.uniform(size=(40, 4))
+    values[rng.uniform(size=values.shape) < 0.15] = np.nan
+    values[3] = np.nan
+    return values
+
+
+def test_masked_distances_match_brute_force(values):
+    points = _Year(year_frame(values), FEATURES[:4], key=None)
+    assert not points.complete
+    result = np.sqrt(points.squared_distances(np.arange(len(values))))
+    np.testing.assert_allclose(result, brute_force(values), atol=1e-7)
+
+
+def test_complete_distances_match_brute_force(values):
+    values = np.nan_to_num(values, nan=0.5)
+    points = _Year(year_frame(values), FEATURES[:4], key=None)
+    assert points.complete
+    result = np.sqrt(points.squared_distances(np.arange(len(values))))
+    np.testing.assert_allclose(result, brute_force(values), atol=1e-7)
+
+
+@pytest.mark.parametrize('block', [1024, 7])
+def test_nearest_matches_brute_force(block, tmp_path):
+    ranking = load_panel(cache_dir=str(tmp_path))[1]
+    index = SimilarityIndex(ranking, block=block)
+    data = ranking[ranking['Year'] == 2018].reset_index(drop=True)
+    distances = brute_force(data[FEATURES].to_numpy(dtype='float64'))
+    np.fill_diagonal(distances, np.inf)
+    result = index.nearest_all(2018, k=5)
+    for i, country in enumerate(data['Country'].astype(str)):
+        found = result[result['Query'] == country]
+        np.testing.assert_allclose(found['Distance'], np.sort(distances[i])[:5], atol=1e-6)
+
+
+def test_refresh_rebuilds_only_the_changed_years(tmp_path):
+    ranking = load_panel(cache_dir=str(tmp_path))[1]
+    index = SimilarityIndex(ranking)
+    changed = ranking.copy()
+    changed.loc[changed['Year'] == 2017, 'Freedom'] = 0.0
+    assert index.refresh(changed) == [2017]
+    assert index.refresh(changed[changed['Year'] != 2015]) == []
+    assert index.years == [2016, 2017, 2018, 2019, 2020]
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from happiness.cache import load_panel
+from happiness.specs import SpecCache
+
+
+@pytest.fixture
+def ranking(tmp_path_factory):
+    return load_panel(cache_dir=str(tmp_path_factory.mktemp('cache')))[1].copy()
+
+
+def test_same_content_is_a_hit(ranking):
+    specs = SpecCache()
+    first = specs.figure(ranking, 'map', indicator='Freedom')
+    assert specs.figure(ranking.copy(), 'map', indicator='Freedom') is first
+    assert (specs.counts['misses'], specs.counts['hits']) == (1, 1)
+
+
+def test_in_place_change_is_a_miss(ranking):
+    specs = SpecCache()
+    first = specs.figure(ranking, 'map', indicator='Freedom')
+    ranking.loc[ranking['Year'] == 2019, 'Freedom'] = 0.5
+    second = specs.figure(ranking, 'map', indicator='Freedom')
+    assert second is not first
+    assert (specs.counts['misses'], specs.counts['hits']) == (2, 0)
+    year = [trace for trace, step in zip(second['data'], second['layout']['sliders'][0]['steps'])
+            if step['label'] == 'Year 2019'][0]
+    assert np.allclose(year['z'], 0.5)
+
+
+def test_disk_tier(ranking, tmp_path):
+    SpecCache(directory=str(tmp_path)).figure(ranking, 'top_scatter', n=5)
+    specs = SpecCache(directory=str(tmp_path))
+    specs.figure(ranking, 'top_scatter', n=5)
+    assert (specs.counts['disk_hits'], specs.counts['misses']) == (1, 0)
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from happiness.stream import RunningStats, aggregate_csv
+
+COLUMNS = ['a', 'b']
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame({'group': rng.choice(['x', 'y', 'z', 'w'], 1000, p=[0.4, 0.3, 0.29, 0.01]),
+                         'a': rng.normal(5.0, 2.0, 1000), 'b': rng.uniform(size=1000) * 100,
+                         'weight': rng.uniform(0.5, 2.0, 1000)})
+    data.loc[rng.choice(1000, 100, replace=False), 'a'] = np.nan
+    #a group seen only in the last chunks
+    data.loc[data.index[-30:], 'group'] = 'late'
+    return data
+
+
+def running(data, chunksize, weighted=False):
+    stats = RunningStats(COLUMNS)
+    for start in range(0, len(data), chunksize):
+        chunk = data.iloc[start:start + chunksize]
+        stats.update(chunk['group'], chunk, chunk['weight'] if weighted else None)
+    return stats.result()
+
+
+@pytest.mark.parametrize('chunksize', [1000, 137, 10])
+def test_unweighted_matches_groupby(data, chunksize):
+    result = running(data, chunksize)
+    grouped = data.groupby('group')
+    for column in COLUMNS:
+        np.testing.assert_allclose(result[column], grouped[column].mean()[result.index])
+        np.testing.assert_array_equal(result[column + ' count'], grouped[column].count()[result.index])
+        np.testing.assert_allclose(result[column + ' variance'], grouped[column].var()[result.index])
+
+
+@pytest.mark.parametrize('chunksize', [1000, 137, 10])
+def test_weighted_matches_weighted_moments(data, chunksize):
+    result = running(data, chunksize, weighted=True)
+    for group, rows in data.groupby('group'):
+        for column in COLUMNS:
+            valid = rows[column].notna()
+            x, w = rows.loc[valid, column], rows.loc[valid, 'weight']
+            mean = np.average(x, weights=w)
+            assert result.loc[group, column] == pytest.approx(mean)
+            assert result.loc[group, column + ' variance'] == pytest.approx(np.average((x - mean) ** 2, weights=w))
+            assert result.loc[group, column + ' count'] == len(x)
+
+
+def test_column_missing_in_a_chunk():
+    data = pd.DataFrame({'group': ['x', 'x', 'x', 'x'], 'a': [np.nan, np.nan, 1.0, 3.0], 'b': [1.0, 2.0, 3.0, 4.0]})
+    result = running(data.assign(weight=1.0), 2)
+    assert result.loc['x', 'a'] == 2.0 and result.loc['x', 'a count'] == 2
+    assert result.loc['x', 'a variance'] == pytest.approx(2.0)
+    assert result.loc['x', 'b variance'] == pytest.approx(data['b'].var())
+
+
+def test_aggregate_csv_does_not_depend_on_the_chunks(data, tmp_path):
+    path = str(tmp_path / 'microdata.csv')
+    data.to_csv(path, index=False)
+    whole = aggregate_csv(path, 'group', {'a': 'a', 'b': 'b'}, weight='weight', chunksize=len(data))
+    chunked = aggregate_csv(path, 'group', {'a': 'a', 'b': 'b'}, weight='weight', chunksize=64)
+    pd.testing.assert_frame_equal(whole.sort_values('Country').reset_index(drop=True),
+                                  chunked.sort_values('Country').reset_index(drop=True))
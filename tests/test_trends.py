@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from happiness.cache import load_panel
+from happiness.schema import INDICATORS
+from happiness.trends import Trends
+
+
+@pytest.fixture(scope='module')
+def ranking(tmp_path_factory):
+    return load_panel(cache_dir=str(tmp_path_factory.mktemp('cache')))[1]
+
+
+def by_country(ranking):
+    """The reports of every country in year order, one data frame per country."""
+    for country, data in ranking.groupby('Country', observed=True, sort=True):
+        yield country, data.sort_values('Year').reset_index(drop=True)
+
+
+def test_changes_match_diff(ranking):
+    changes = Trends(ranking).changes().set_index(['Country', 'Year'])
+    for country, data in by_country(ranking):
+        result = changes.loc[country]
+        assert result.index.tolist() == data['Year'].tolist()
+        np.testing.assert_array_equal(result['Year Gap'], data['Year'].diff())
+        np.testing.assert_array_equal(result['Rank Movement'], -data['Happiness Rank'].diff())
+        for column in INDICATORS:
+            np.testing.assert_allclose(result[column + ' change'], data[column].diff(), equal_nan=True)
+
+
+@pytest.mark.parametrize('window', [2, 3])
+def test_volatility_matches_rolling_std(ranking, window):
+    volatility = Trends(ranking).volatility(window).set_index(['Country', 'Year'])
+    for country, data in by_country(ranking):
+        result = volatility.loc[country]
+        expected = (-data['Happiness Rank'].diff()).rolling(window, min_periods=2).std()
+        np.testing.assert_allclose(result['Rank Movement volatility'], expected, equal_nan=True)
+        for column in INDICATORS:
+            expected = data[column].diff().rolling(window, min_periods=2).std()
+            np.testing.assert_allclose(result[column + ' volatility'], expected, rtol=1e-5, equal_nan=True)
+
+
+def test_summary_takes_whole_reports(ranking):
+    ranking = ranking.copy()
+    last = ranking.index[(ranking['Country'] == 'Poland') & (ranking['Year'] == ranking['Year'].max())]
+    ranking.loc[last, 'Freedom'] = np.nan
+    summary = Trends(ranking).summary().set_index('Country')
+    poland = ranking[ranking['Country'] == 'Poland'].sort_values('Year')
+    assert summary.loc['Poland', 'Last Year'] == poland['Year'].iloc[-1]
+    #the change is missing, not taken from the report before the last one
+    assert np.isnan(summary.loc['Poland', 'Freedom change'])
+    expected = poland['Generosity'].iloc[-1] - poland['Generosity'].iloc[0]
+    assert summary.loc['Poland', 'Generosity change'] == pytest.approx(expected)
+    assert summary.loc['Poland', 'Rank Movement'] == \
+        poland['Happiness Rank'].iloc[0] - poland['Happiness Rank'].iloc[-1]
+
+
+def test_summary_of_every_country(ranking):
+    summary = Trends(ranking).summary().set_index('Country')
+    for country, data in by_country(ranking):
+        first, last = data.iloc[0], data.iloc[-1]
+        assert (summary.loc[country, 'First Year'], summary.loc[country, 'Last Year']) == (first['Year'], last['Year'])
+        for column in INDICATORS:
+            assert summary.loc[country, column + ' change'] == pytest.approx(last[column] - first[column], nan_ok=True)